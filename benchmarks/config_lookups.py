@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import tempfile
+
+from configparser import ConfigParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config
+
+# number of keys spread across the sections of the test file
+keys = 300
+sections = ['cogs.whitelist', 'cogs.greeter', 'cogs.spam', 'cogs.voice']
+duration = 2.0
+
+def make_config(path):
+    parser = ConfigParser()
+    for section in sections:
+        parser[section] = {}
+    for i in range(keys):
+        parser[sections[i % len(sections)]][str(100000 + i)] = str(i)
+    with open(path, 'w') as f:
+        parser.write(f)
+
+# previous behaviour: re-read the whole file on every lookup
+def reread_lookup(parser, path, section, key):
+    parser.read(path)
+    return parser.getint(section, key, fallback=None)
+
+def run(name, func):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        for i in range(100):
+            func(sections[i % len(sections)], str(100000 + i))
+        count = count + 100
+    rate = count / (time.perf_counter() - start)
+    print(f"{name}: {rate:,.0f} lookups/s")
+    return rate
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.ini')
+        make_config(path)
+
+        parser = ConfigParser()
+        config = Config(path)
+
+        before = run('re-read per lookup', lambda s, k: reread_lookup(parser, path, s, k))
+        after = run('cached Config', lambda s, k: config.getint(s, k))
+        print(f"speedup: {after / before:,.0f}x ({keys} keys)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import tempfile
+
+from configparser import ConfigParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import ConfigRegistry, SettingsDatabase
+
+guilds = 10000
+
+def make_guilds(directory):
+    for guild_id in range(guilds):
+        parser = ConfigParser()
+        parser['cogs.whitelist'] = {str(1000 + guild_id): '5'}
+        parser['cogs.spam'] = {'message_pool': '5', 'trigger_time_delta': '1500'}
+        parser['cogs.voice'] = {'voice_auto_disconnect': 'True'}
+        with open(f'{directory}/{guild_id}.ini', 'w') as f:
+            parser.write(f)
+
+def timed(name, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {elapsed:.2f}s")
+
+# previous on_ready: parse every guild's file before anything can run
+def eager(directory):
+    configs = {}
+    for guild_id in range(guilds):
+        configs[guild_id] = ConfigParser()
+        configs[guild_id].read(f'{directory}/{guild_id}.ini')
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        make_guilds(tmp)
+        print(f"{guilds} synthetic guilds")
+
+        timed("eager parse per guild (old on_ready)", lambda: eager(tmp))
+
+        registry = ConfigRegistry(tmp)
+        timed("lazy registry, first access of one guild", lambda: registry[0].get('cogs.spam', 'message_pool'))
+        timed("ini warm-up", lambda: registry.warm(range(guilds)))
+        timed("ini warm-up again (idempotent)", lambda: registry.warm(range(guilds)))
+
+        timed("migrate ini files to sqlite", lambda: SettingsDatabase(f'{tmp}/settings.db').import_ini(tmp))
+
+        registry = ConfigRegistry(tmp, 'sqlite')
+        timed("sqlite warm-up", lambda: registry.warm(range(guilds)))
+        timed("sqlite warm-up again (idempotent)", lambda: registry.warm(range(guilds)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import asyncio
+
+from types import SimpleNamespace
+from contextlib import ExitStack
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from discord.ext import commands
+from confirmations import Confirmations
+
+pending = [0, 10, 100, 1000]
+events = 5000
+
+async def drain():
+    # let the listener tasks scheduled by dispatch run
+    for i in range(3):
+        await asyncio.sleep(0)
+
+async def with_wait_for(client, count):
+    # one wait_for per pending gamble, the check runs on every reaction
+    authors = [SimpleNamespace(id=uid) for uid in range(count)]
+    waiters = [asyncio.ensure_future(client.wait_for('reaction_add', check=lambda reaction, user, author=author: user == author)) for author in authors]
+    await drain()
+
+    stranger = SimpleNamespace(id=-1)
+    reaction = SimpleNamespace(emoji='✅')
+    start = time.perf_counter()
+    for i in range(events):
+        client.dispatch('reaction_add', reaction, stranger)
+        await drain()
+    elapsed = time.perf_counter() - start
+
+    for waiter in waiters:
+        waiter.cancel()
+    return elapsed / events * 1000000
+
+async def with_registry(client, count):
+    confirmations = Confirmations(client)
+    with ExitStack() as stack:
+        for uid in range(count):
+            stack.enter_context(confirmations.expect('reaction', uid, uid, ('✅', '❌')))
+
+        payload = SimpleNamespace(message_id=-1, user_id=-1, emoji='✅')
+        start = time.perf_counter()
+        for i in range(events):
+            client.dispatch('raw_reaction_add', payload)
+            await drain()
+        elapsed = time.perf_counter() - start
+
+    return elapsed / events * 1000000
+
+async def main():
+    client = commands.Bot(command_prefix='$', loop=asyncio.get_event_loop())
+    print(f"{'pending':>8} {'wait_for (us/event)':>20} {'registry (us/event)':>20}")
+    for count in pending:
+        before = await with_wait_for(client, count)
+        after = await with_registry(client, count)
+        print(f"{count:>8} {before:>20.1f} {after:>20.1f}")
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+
+from contextlib import nullcontext
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import game
+from game import Game, Storage, AccountLocks, flusher
+
+users = 1000
+# commands per run, commit mode waits on a disk sync for every one
+commands = {'commit': 2000, 'interval': 20000}
+threads = 4
+
+class NoLocks:
+    # how transactions ran before account locks
+    def hold(self, *uids):
+        return nullcontext()
+
+def hold(locks, uids, count):
+    start = time.perf_counter()
+    for i in range(count):
+        with locks.hold(1, *uids):
+            pass
+    return (time.perf_counter() - start) / count * 1000000
+
+def play(game, uids, count):
+    for i in range(count):
+        game.donate(uids[i % len(uids)], uids[(i + 1) % len(uids)], 1)
+
+def run(game, groups, total):
+    # one thread per group of accounts, returns commands per second
+    count = total // len(groups)
+    workers = [threading.Thread(target=play, args=(game, uids, count)) for uids in groups]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return count * len(groups) / (time.perf_counter() - start)
+
+def main():
+    game.console_log = lambda *args: None
+
+    locks = AccountLocks()
+    print(f"hold one account: {hold(locks, (1, ), 100000):.2f}us, two accounts: {hold(locks, (2, 1), 100000):.2f}us")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for durability in ['commit', 'interval']:
+            economy = Game(1, Storage(f'{tmp}/{durability}'), durability)
+            for uid in range(users):
+                economy.register(uid)
+            with economy.bulk() as c:
+                c.execute("UPDATE accounts SET cash=1000000")
+
+            # unrelated users: every thread donates among its own accounts
+            unrelated = [list(range(index * 10, index * 10 + 10)) for index in range(threads)]
+            # contended: every thread donates between the same two accounts
+            contended = [[0, 1] if index % 2 else [1, 0] for index in range(threads)]
+
+            for name, table in [('no account locks', NoLocks()), ('account locks', AccountLocks())]:
+                economy.locks = table
+                total = commands[durability]
+                single = run(economy, unrelated[:1], total)
+                print(f"{durability:>9} {name:>17}: one thread {single:>10,.0f}, {threads} threads unrelated {run(economy, unrelated, total):>10,.0f}, same accounts {run(economy, contended, total):>10,.0f} commands/s")
+
+            flusher.flush()
+
+if __name__ == '__main__':
+    main()
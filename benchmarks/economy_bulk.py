@@ -0,0 +1,54 @@
+import io
+import os
+import sys
+import csv
+import json
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from game import Game, Storage
+
+sizes = [10000, 100000]
+# per row commits are slow enough that a sample is plenty
+sample = 500
+
+def measure(name, rows, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>28} {rows:>7}: {rows / elapsed:>12,.0f} rows/s")
+
+def per_row(game, uids):
+    # what a payout looked like before: one transaction per user
+    for uid in uids:
+        with game.transaction(uid) as accounts:
+            account = accounts.account(uid)
+            account.cash = account.cash + 10
+            accounts.save(account)
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ['guild', 'sharded']:
+            for rows in sizes:
+                storage = Storage(f'{tmp}/{mode}-{rows}', mode)
+                game = Game(1, storage)
+
+                records = [{"uid": uid, "level": 1 + uid % 50, "cash": uid % 1000} for uid in range(rows)]
+                text = io.StringIO()
+                writer = csv.DictWriter(text, ["uid", "level", "cash"])
+                writer.writeheader()
+                writer.writerows(records)
+
+                measure(f"{mode} import_accounts csv", rows, lambda: game.import_accounts(io.StringIO(text.getvalue()), 'csv'))
+                measure(f"{mode} import_accounts json", rows, lambda: game.import_accounts(io.StringIO(json.dumps(records)), 'json'))
+                measure(f"{mode} bulk_add_cash", rows, lambda: game.bulk_add_cash(range(rows), 10))
+                measure(f"{mode} bulk_reset (uids)", rows, lambda: game.bulk_reset(range(rows)))
+                measure(f"{mode} bulk_reset (guild)", rows, lambda: game.bulk_reset())
+                measure(f"{mode} per row commits", sample, lambda: per_row(game, range(sample)))
+
+                storage.close()
+
+if __name__ == '__main__':
+    main()
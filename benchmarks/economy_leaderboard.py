@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from game import Game, Storage, boards
+
+rows = 500000
+lookups = 20000
+updates = 2000
+
+def populate(storage, guild_id):
+    with storage.connect(guild_id) as conn:
+        with conn:
+            conn.executemany("INSERT INTO accounts (guild_id, uid, level, exp, cash, balance) VALUES (?, ?, ?, ?, ?, ?)",
+                ((guild_id, uid, random.randint(1, 60), random.randint(0, 100), random.randint(0, 10 ** 6), random.randint(0, 10 ** 6) if uid % 2 else 0) for uid in range(rows)))
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = Storage(tmp, 'sharded')
+        populate(storage, 1)
+        game = Game(1, storage)
+
+        with storage.connect(1) as conn:
+            start = time.perf_counter()
+            conn.execute("SELECT uid, cash + balance AS score FROM accounts WHERE guild_id=1 ORDER BY score DESC LIMIT 10").fetchall()
+            print(f"naive ORDER BY networth: {(time.perf_counter() - start) * 1000:.1f}ms per page")
+
+        for board in boards:
+            start = time.perf_counter()
+            game.leaderboard(board)
+            built = time.perf_counter() - start
+
+            ranking = game.rankings[board]
+            uids = [random.randrange(rows) for i in range(lookups)]
+            start = time.perf_counter()
+            for uid in uids:
+                ranking.rank(uid)
+            rank = (time.perf_counter() - start) / lookups * 1000000
+
+            print(f"{board:>9}: build {built * 1000:.0f}ms, rank {rank:.2f}us")
+
+        # every command that changes a balance reranks its users on all live boards
+        for live in [{}, game.rankings]:
+            game.rankings, rankings = live, game.rankings
+            uids = [random.randrange(rows) for i in range(updates)]
+            start = time.perf_counter()
+            for uid in uids:
+                game.gamble(uid, 0)
+            per_update = (time.perf_counter() - start) / updates * 1000000
+            print(f"gamble with {len(live)} live boards: {per_update:.0f}us per command")
+            game.rankings = rankings
+
+        start = time.perf_counter()
+        for page in range(1, 1001):
+            game.leaderboard('cash', page)
+        print(f"leaderboard page: {(time.perf_counter() - start):.2f}ms")
+
+        storage.close()
+
+if __name__ == '__main__':
+    main()
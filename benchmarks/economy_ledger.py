@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import game as economy
+from game import Game, Storage, Accounts, GameExceptions, flusher
+
+users = 1000
+commands = 5000
+rows = 100000
+
+def unlogged(self, uid, delta, kind, counterparty=None, account='cash'):
+    pass
+
+def unbatched(self, uid, delta, kind, counterparty=None, account='cash'):
+    # one insert per entry, at the time of the change
+    if delta:
+        self.c.execute(economy.ledger_insert, (self.guild_id, uid, counterparty, account, int(delta), kind, int(time.time() * 1000)))
+
+def play(game):
+    random.seed(0)
+    start = time.perf_counter()
+    for _ in range(commands):
+        uid = random.randrange(users)
+        try:
+            if random.random() < 0.5:
+                game.work(uid)
+            else:
+                game.donate(uid, random.randrange(users), 1)
+        except GameExceptions.NotEnoughCash:
+            pass
+        except Exception as error:
+            if not isinstance(error, economy.commands.CommandError):
+                raise
+    return commands / (time.perf_counter() - start)
+
+def main():
+    economy.console_log = lambda *args: None
+    record = Accounts.record
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for durability in ['commit', 'interval']:
+            for name, method in [('no ledger', unlogged), ('per entry inserts', unbatched), ('batched ledger', record)]:
+                if durability == 'interval' and method is unbatched:
+                    continue
+
+                Accounts.record = method
+                economy.CachedAccounts.record = method if method is not unbatched else record
+
+                game = Game(1, Storage(f'{tmp}/{durability}-{name}'), durability)
+                for uid in range(users):
+                    game.register(uid)
+
+                rate = play(game)
+                flusher.flush()
+                print(f"{durability:>9} {name:>18}: {rate:>10,.0f} commands/s")
+
+        Accounts.record = record
+        economy.CachedAccounts.record = record
+
+        # a guild with a long history, verified by streaming both sides
+        game = Game(2, Storage(f'{tmp}/verify'), 'commit')
+        with game.bulk() as c:
+            c.executemany("INSERT INTO accounts (guild_id, uid, cash) VALUES (2, ?, ?)", ((uid, uid % 1000) for uid in range(rows)))
+            c.executemany("INSERT INTO ledger (guild_id, uid, account, delta, kind, ts) VALUES (2, ?, 'cash', ?, 'opening', 0)", ((uid, uid % 1000) for uid in range(rows)))
+            c.executemany("INSERT INTO ledger (guild_id, uid, account, delta, kind, ts) VALUES (2, ?, 'cash', 0, 'work', 0)", ((uid, ) for uid in range(0, rows, 3)))
+
+        start = time.perf_counter()
+        data = game.verify_ledger()
+        elapsed = time.perf_counter() - start
+        print(f"verify_ledger: {data['checked']} accounts, {data['mismatches']} mismatched, {data['checked'] / elapsed:,.0f} accounts/s")
+
+if __name__ == '__main__':
+    main()
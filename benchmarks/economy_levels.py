@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from levels import Curve, default
+
+# exp granted at once, from a normal work roll to an admin multiplied donation
+grants = [10, 1000, 100000, 10000000, 1000000000]
+levels = [1, 50, 2000]
+repeat = 2000
+
+def loop(curve, level, exp):
+    # the level up loop User.gain_exp used before
+    while exp > curve.threshold(level):
+        exp = exp - curve.threshold(level)
+        level = level + 1
+    return level, exp
+
+def measure(func, curve, level, exp, count):
+    start = time.perf_counter()
+    for i in range(count):
+        func(curve, level, exp)
+    return (time.perf_counter() - start) / count * 1000000
+
+def main():
+    for curve in [default, Curve(0, 5, 10)]:
+        print(f"curve {curve}")
+        print(f"{'level':>6} {'grant':>12} {'levels':>8} {'loop (us)':>12} {'curve.add (us)':>15}")
+        for level in levels:
+            for exp in grants:
+                reached, left = curve.add(level, exp)
+                # the loop is linear in levels crossed, keep its runs short
+                count = max(1, min(repeat, repeat * 100 // max(1, reached - level)))
+                before = measure(loop, curve, level, exp, count)
+                after = measure(Curve.add, curve, level, exp, repeat)
+                print(f"{level:>6} {exp:>12} {reached - level:>8} {before:>12.2f} {after:>15.2f}")
+
+if __name__ == '__main__':
+    main()
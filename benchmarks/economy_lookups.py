@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from game import migrate
+
+sizes = [1000, 10000, 50000, 200000]
+lookups = 2000
+
+def make_legacy(path, rows):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE users (uid INTEGER, level INTEGER, exp INTEGER, cash INTEGER)")
+        conn.executemany("INSERT INTO users VALUES (?, 1, 0, 0)", ((uid,) for uid in range(rows)))
+    return conn
+
+def measure(conn, rows, query):
+    c = conn.cursor()
+    uids = [random.randrange(rows) for i in range(lookups)]
+    start = time.perf_counter()
+    for uid in uids:
+        c.execute(query, {"guild": 0, "uid": uid})
+        c.fetchone()
+    return (time.perf_counter() - start) / lookups * 1000000
+
+def main():
+    print(f"{'rows':>8} {'legacy (us)':>12} {'migrated (us)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            conn = make_legacy(f'{tmp}/{rows}.db', rows)
+            legacy = measure(conn, rows, "SELECT uid, level, exp, cash FROM users WHERE uid=:uid")
+            migrate(conn, 0)
+            migrated = measure(conn, rows, "SELECT uid, level, exp, cash, work, rob, balance FROM accounts WHERE guild_id=:guild AND uid=:uid")
+            conn.close()
+            print(f"{rows:>8} {legacy:>12.1f} {migrated:>14.1f}")
+
+if __name__ == '__main__':
+    main()
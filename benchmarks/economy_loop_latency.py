@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from game import Game, AsyncGame, Storage
+
+guilds = 8
+users = 200
+bursts = 20
+burst_size = 100
+
+# stand-in for the gateway heartbeat: how late does a 10ms timer fire?
+async def heartbeat(lags, done):
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+async def command(game, uid, use_async):
+    if use_async:
+        await game.work(uid)
+    else:
+        game.work(uid)
+        await asyncio.sleep(0)
+
+async def run(games, use_async):
+    lags = []
+    done = asyncio.Event()
+    ticker = asyncio.create_task(heartbeat(lags, done))
+
+    start = time.perf_counter()
+    for burst in range(bursts):
+        await asyncio.gather(*[
+            command(games[index % guilds], index % users, use_async)
+            for index in range(burst_size)
+        ])
+        await asyncio.sleep(0.02)
+    elapsed = time.perf_counter() - start
+
+    done.set()
+    await ticker
+
+    lags.sort()
+    p50 = lags[len(lags) // 2] * 1000
+    worst = lags[-1] * 1000
+    name = "async facade" if use_async else "sync in coroutine"
+    print(f"{name}: {bursts * burst_size / elapsed:,.0f} cmds/s, heartbeat lag p50 {p50:.1f}ms, max {worst:.1f}ms")
+
+async def main():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+
+        storage = Storage(f'{tmp}/saves')
+        games = [Game(guild_id, storage) for guild_id in range(guilds)]
+        for game in games:
+            for uid in range(users):
+                game.register(uid)
+        await run(games, False)
+
+        games = [AsyncGame(game) for game in games]
+        await run(games, True)
+
+        storage.close()
+        os.chdir(cwd)
+
+if __name__ == '__main__':
+    asyncio.run(main())
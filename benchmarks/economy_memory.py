@@ -0,0 +1,49 @@
+import os
+import sys
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from game import Account, AccountCache, Storage
+
+accounts = 1000000
+
+class DictAccount:
+    # the previous __dict__ based representation
+    def __init__(self, uid, level=1, exp=0, cash=0, work=0, rob=0, balance=0):
+        self.uid = uid
+        self.level = level
+        self.exp = exp
+        self.cash = cash
+        self.work = work
+        self.rob = rob
+        self.balance = balance
+
+def rows():
+    random.seed(0)
+    # discord snowflakes are large enough that every uid is its own int object
+    for index in range(accounts):
+        yield (10 ** 17 + index, random.randint(1, 60), random.randint(0, 100), random.randint(0, 10 ** 6), 0, 0, random.randint(0, 10 ** 6))
+
+def measure(name, build):
+    tracemalloc.start()
+    kept = build()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>24}: {size / 2 ** 20:>7.1f} MiB, {size / accounts:>5.0f} bytes per account")
+    return kept
+
+def cache():
+    cache = AccountCache(0, Storage(), capacity=accounts)
+    for row in rows():
+        cache.put(row[0], row[1:])
+    return cache
+
+def main():
+    measure("dict objects", lambda: {row[0]: DictAccount(*row) for row in rows()})
+    measure("__slots__ objects", lambda: {row[0]: Account(*row) for row in rows()})
+    measure("AccountCache rows", cache)
+
+if __name__ == '__main__':
+    main()
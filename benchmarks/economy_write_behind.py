@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from game import Game, Storage, flusher
+
+users = 500
+commands = 20000
+# a few hot users take most of the commands
+hot = 20
+
+def measure(game):
+    for uid in range(users):
+        game.register(uid)
+
+    uids = [random.randrange(hot) if random.random() < 0.8 else random.randrange(users) for i in range(commands)]
+    start = time.perf_counter()
+    for index, uid in enumerate(uids):
+        if index % 2:
+            game.work(uid)
+        else:
+            game.gamble(uid, 0)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    flusher.flush()
+    return commands / elapsed, time.perf_counter() - start
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ['guild', 'sharded']:
+            for durability in ['commit', 'interval']:
+                storage = Storage(f'{tmp}/{mode}-{durability}', mode)
+                rate, flush = measure(Game(1, storage, durability))
+                storage.close()
+                print(f"{mode:>8} {durability:>9}: {rate:>9,.0f} cmds/s, final flush {flush * 1000:.1f}ms")
+
+if __name__ == '__main__':
+    main()
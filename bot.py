@@ -5,7 +5,8 @@ from glob import glob
 from discord.ext import commands
 from dotenv import load_dotenv
 from logger import console_log
-from config import Config
+from config import configs
+from confirmations import Confirmations
 
 # load and read token from .env
 load_dotenv()
@@ -34,7 +35,11 @@ intents.presences = False
 client = commands.AutoShardedBot(command_prefix='$', help_command=None, intents=intents)
 
 # client.property
-client.config = {}
+client.config = configs
+client.confirmations = Confirmations(client)
+
+# select config storage: 'ini' (one file per guild) or 'sqlite'
+configs.configure(os.getenv('CONFIG_BACKEND', 'ini'))
 
 # load cogs from /cogs
 for name in cog_names:
@@ -53,10 +58,9 @@ async def on_ready():
         )
     )
 
-    # init per guild config
-    for guild in client.guilds:
-        config_path = f'./config/{guild.id}.ini'
-        client.config[guild.id] = Config(config_path)
+    # warm up per guild config, guilds seen on an earlier on_ready are skipped
+    warmed = await client.config.awarm(guild.id for guild in client.guilds)
+    console_log(f"Loaded config for {warmed} guilds.")
 
 # run bot
 client.run(token)
\ No newline at end of file
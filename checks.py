@@ -1,19 +1,19 @@
-from config import Config
+from config import configs
 
-def is_whitelisted(ctx):
-    config_path = f'./config/{ctx.guild.id}.ini'
-    config = Config(config_path)
+# coroutines so the config is read off the event loop, discord.py awaits async checks
 
-    if config.get('cogs.whitelist', ctx.author.id):
+async def is_whitelisted(ctx):
+    config = configs[ctx.guild.id]
+
+    if await config.aget('cogs.whitelist', ctx.author.id):
         return True
     else:
         return False
 
-def whitelist_level(ctx, level=0):
-    config_path = f'./config/{ctx.guild.id}.ini'
-    config = Config(config_path)
+async def whitelist_level(ctx, level=0):
+    config = configs[ctx.guild.id]
 
-    access = config.getint('cogs.whitelist', ctx.author.id)
+    access = await config.agetint('cogs.whitelist', ctx.author.id)
 
     if access >= level:
         return True
@@ -1,9 +1,10 @@
 import discord
 import colors
 
-from discord.ext import commands
+from discord.ext import commands, tasks
 from checks import is_whitelisted, whitelist_level
 from logger import console_log
+from config import stats
 from bot import cog_names
 
 class InsufficientAccess(commands.CommandError):
@@ -19,6 +20,15 @@ class Admin(commands.Cog):
         self.client = client
         self.config = client.config
 
+        self.log_config_stats.start()
+
+    def cog_unload(self):
+        self.log_config_stats.cancel()
+
+    @tasks.loop(minutes=10)
+    async def log_config_stats(self):
+        console_log(stats.summary())
+
     async def cog_command_error(self, ctx, error):
         await ctx.send(
             embed = discord.Embed(
@@ -33,7 +43,12 @@ class Admin(commands.Cog):
     async def adminhelp(self, ctx):
         commands = {
             "cogs": "List all loaded modules",
+            "configstats": "Show config access counters and latencies.",
             "(r)reload(c)og <name>": "Reload the specified module.",
+            "payout <amount> [@role]": "Give every registered member, or members of a role, some cash.",
+            "resetaccounts <@user|everyone>": "Reset a user's economy account, or every account.",
+            "importaccounts": "Import economy accounts from an attached .csv or .json file.",
+            "verifyledger [repair]": "Check economy balances against the transaction ledger, optionally fixing them.",
             "(r)estart": "Restarts the bot."
         }
 
@@ -50,7 +65,7 @@ class Admin(commands.Cog):
     async def cogs(self, ctx):
         required_access = 3
 
-        if not whitelist_level(ctx, required_access):
+        if not await whitelist_level(ctx, required_access):
             raise InsufficientAccess("You do not have access to this command.")
 
         embed = discord.Embed(
@@ -63,12 +78,42 @@ class Admin(commands.Cog):
 
         await ctx.send(embed=embed)
 
+    @commands.command(aliases=["cstats"])
+    @commands.check(is_whitelisted)
+    async def configstats(self, ctx, count=10):
+        required_access = 3
+
+        if not await whitelist_level(ctx, required_access):
+            raise InsufficientAccess("You do not have access to this command.")
+
+        embed = discord.Embed(
+            title = "Config Stats",
+            description = stats.summary(),
+            colour = colors.blue
+        )
+        embed.add_field(
+            name = "Top Keys",
+            value = "".join(
+                [f"`{section}/{key}` reads: {counter[0]} ({counter[1]} hits, {counter[2]} misses), writes: {counter[3]}\n" for (section, key), counter in stats.top(int(count))]
+            )[:1024] or "No config access yet.",
+            inline = False
+        )
+        embed.add_field(
+            name = "Latency",
+            value = "".join(
+                [f"**{operation}** x{total}: p50 < {p50}us, p99 < {p99}us\n" for operation, (total, p50, p99) in stats.latencies().items()]
+            ) or "No samples yet.",
+            inline = False
+        )
+
+        await ctx.send(embed=embed)
+
     @commands.command(aliases=["rc"])
     @commands.check(is_whitelisted)
     async def reloadcog(self, ctx, name):
         required_access = 3
 
-        if not whitelist_level(ctx, required_access):
+        if not await whitelist_level(ctx, required_access):
             raise InsufficientAccess("You do not have access to this command.")
 
         if name in cog_names:
@@ -87,7 +132,7 @@ class Admin(commands.Cog):
     async def restart(self, ctx):
         required_access = 5
 
-        if not whitelist_level(ctx, required_access):
+        if not await whitelist_level(ctx, required_access):
             raise InsufficientAccess("You do not have access to this command.")
 
         name = ctx.author.nick if ctx.author.nick else ctx.author.name
@@ -2,33 +2,60 @@ import discord
 import colors
 
 from discord.ext import commands
+from config import Setting, register_settings, bus
 
 settings = {
-    "use_custom_message": "False"
+    "use_custom_message": Setting(bool, False),
+    "custom_message": Setting(str),
+    "welcome_channel": Setting(int)
 }
+register_settings(__name__, settings)
+
+# guild id -> (use_custom_message, custom_message, welcome_channel), dropped when the config changes
+greetings = {}
+# guild id -> number of config changes seen, so a read that raced one is not cached
+generations = {}
 
 class Greeter(commands.Cog):
     def __init__(self, client):
         self.client = client
         self.config = client.config
 
-    @commands.Cog.listener()
-    async def on_ready(self):
-        # init config data for this cog
-        for guild in self.client.guilds:
-            for key, value in settings.items():
-                if not self.config[guild.id].get(__name__, key):
-                    self.config[guild.id].set(__name__, key, value)
+        bus.subscribe(self.on_config_change, __name__)
+
+    def cog_unload(self):
+        bus.unsubscribe(self.on_config_change, __name__)
+
+    def on_config_change(self, guild_id, section, key, old, new):
+        generations[guild_id] = generations.get(guild_id, 0) + 1
+        greetings.pop(guild_id, None)
+
+    async def get_greeting(self, guild):
+        # checks the store when due, outside edits are published and drop the cached tuple
+        config = await self.config.aload(guild.id)
+
+        greeting = greetings.get(guild.id)
+        if greeting is None:
+            generation = generations.get(guild.id, 0)
+            greeting = (
+                await config.asetting(__name__, 'use_custom_message'),
+                await config.asetting(__name__, 'custom_message'),
+                await config.asetting(__name__, 'welcome_channel')
+            )
+
+            # a change that arrived during the reads bumped the generation, keep it
+            # out of the cache so the next call reads the new values
+            greetings[guild.id] = greeting
+            if generations.get(guild.id, 0) != generation:
+                greetings.pop(guild.id, None)
+        return greeting
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
         guild = member.guild
-        config = self.config[guild.id]
 
         default_greet_message = f"Welcome to **{guild.name}**, {member.mention}!"
-        use_custom_message = config.getboolean(__name__, 'use_custom_message')
-        custom_message = config.get(__name__, 'custom_message')
-        welcome_channel_id = config.getint(__name__, 'welcome_channel')
+        use_custom_message, custom_message, welcome_channel_id = await self.get_greeting(guild)
         channel = self.client.get_channel(welcome_channel_id)
 
         if use_custom_message and custom_message and channel:
@@ -53,7 +80,7 @@ class Greeter(commands.Cog):
     @commands.command()
     @commands.has_permissions(manage_channels=True)
     async def setgreeting(self, ctx, *, message):
-        config = self.config[ctx.guild.id]
+        config = await self.config.aload(ctx.guild.id)
 
         # removes tick/double tick from message
         # ticks may cause formatting errors in config files
@@ -62,7 +89,7 @@ class Greeter(commands.Cog):
         if message.endswith('"') or message.endswith("'"):
             message = message[:-1]
 
-        config.set(__name__, "custom_message", message)
+        await config.aset(__name__, "custom_message", message)
 
         await ctx.send(
             embed = discord.Embed(
@@ -74,11 +101,11 @@ class Greeter(commands.Cog):
     @commands.command()
     @commands.has_permissions(manage_channels=True)
     async def setgreetmode(self, ctx):
-        config = self.config[ctx.guild.id]
-        value = config.getboolean(__name__, 'use_custom_message')
+        config = await self.config.aload(ctx.guild.id)
+        value = await config.asetting(__name__, 'use_custom_message')
         
         value = False if value else True
-        config.set(__name__, 'use_custom_message', str(value))
+        await config.aset(__name__, 'use_custom_message', str(value))
 
         await ctx.send(
             embed = discord.Embed(
@@ -90,9 +117,9 @@ class Greeter(commands.Cog):
     @commands.command()
     @commands.has_permissions(manage_channels=True)
     async def setgreetchannel(self, ctx):
-        config = self.config[ctx.guild.id]
+        config = await self.config.aload(ctx.guild.id)
 
-        config.set(__name__, 'welcome_channel', ctx.channel.id)
+        await config.aset(__name__, 'welcome_channel', ctx.channel.id)
 
         await ctx.send(
             embed = discord.Embed(
@@ -1,18 +1,178 @@
+import io
+import time
+import typing
 import discord
 import colors
 import asyncio
 import DiscordUtils
 
 from discord.ext import commands
-from game import Game, User, Perk, GameExceptions, Bank
+from game import Game, AsyncGame, GameExceptions
+from levels import Curve, default
+from checks import is_whitelisted, whitelist_level
 from logger import console_log
+from config import Setting, register_settings
 
 games = {}
-settings = {}
+settings = {
+    # exp for level n to n + 1 is a * n^2 + b * n + c, written as "a,b,c"
+    "level_curve": Setting(Curve.parse, default)
+}
+register_settings(__name__, settings)
+
+# ==== embed templates =====
+# embeds that never change are built once and sent as they are
+
+def help_page(name, commands):
+    embed = discord.Embed(
+        colour=colors.blue,
+        title="Mona Heist",
+        description="Economy System v2.1"
+    )
+    embed.add_field(
+        name=name,
+        value="".join([f"**${key}**\n{value}\n\n" for key, value in commands.items()])
+    )
+    embed.set_thumbnail(url="https://i.imgur.com/nGaddfb.png")
+    return embed
+
+help_pages = [
+    help_page("Commands", {
+        "register": "Grants you access to Mona Heist.",
+        "(w)ork": "Earn money and exp every five minutes. Scales with level.",
+        "rob @user": "Take someone's money. Has a chance to get caught and fined instead.",
+        "donate @user <amount>": "Give someone cash and earn exp. Has a cooldown of 30 seconds.",
+        "gamble <amount>": "Get a chance to double your money, or lose double.",
+        "charity <amount>": "Donate to charity and receive exp.",
+        "profile @user": "View user profile.",
+        "(l)eader(b)oard [cash|bank|level|networth] [page]": "View the richest and most experienced users."
+    }),
+    help_page("Perk Commands", {
+        "perk": "View your perks.",
+        "shop": "List of perks that can be purchased.",
+        "buy <ID> <amount>": "Buy perks from the shop"
+    }),
+    help_page("Bank Commands", {
+        "bank": "View your bank balance.",
+        "(dep)osit <amount>": "Deposit cash to your bank account.",
+        "take <amount>": "Take cash from your bank account.",
+        "transfer @user <amount>": "Transfer money to another user's bank account.",
+        "history [@user]": "View the latest cash and bank transactions."
+    })
+]
+
+shop_items = {
+    'work': {'price': '10', 'code': 'work', 'name': 'Energy Drink', 'desc': 'Increases cash and exp gained from `$work`.'},
+    'rob': {'price': '50', 'code': 'rob', 'name': 'Tactical Robbery', 'desc': 'Reduces the chance of failing in `$rob`.'}
+}
+
+shop = discord.Embed(
+    title = 'Perk Shop',
+    description = "".join(
+        [f"Code: `{item.get('code')}` | **{item.get('name')}** `${item.get('price')}`\n{item.get('desc')}\n\n" for key, item in shop_items.items()]
+    ),
+    colour = colors.blue
+)
+shop.set_footer(
+    text="Use [$buy <code> <qty>] to buy perks."
+)
+
+already_registered = discord.Embed(
+    colour=colors.red,
+    title='Yikes!',
+    description='It seems that you are already registered.'
+)
+already_registered.set_thumbnail(url='https://chpic.su/_data/stickers/p/Paimon_Emoji_Set/Paimon_Emoji_Set_012.webp')
+
+registered = discord.Embed(
+    colour=colors.green,
+    title='Nice!',
+    description='You are now registered!'
+)
+registered.set_thumbnail(url='https://chpic.su/_data/stickers/p/Paimon_Emoji_Set/Paimon_Emoji_Set_005.webp')
+
+rob_self = discord.Embed(
+    description = "You cannot rob yourself.",
+    colour = colors.red
+)
+
+gamble_cancelled = discord.Embed(
+    description = "Gamble cancelled.",
+    colour = colors.red
+)
+
+class Announcements:
+    # level ups are collected per channel and sent as one message a few seconds
+    # after the first, instead of one message for every level up
+    delay = 3
+    # names listed in one message, the rest are counted
+    limit = 20
+
+    def __init__(self):
+        # channel id -> (channel, {member id: (member, level)})
+        self.pending = {}
+        self.tasks = set()
+
+    def levelup(self, channel, member, level):
+        entry = self.pending.get(channel.id)
+        if entry is None:
+            entry = self.pending[channel.id] = (channel, {})
+            task = asyncio.ensure_future(self.send_later(channel.id))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+        # a member levelling twice in the window is announced once, at the highest level
+        entry[1][member.id] = (member, level)
+
+    async def send_later(self, channel_id):
+        await asyncio.sleep(self.delay)
+        channel, levels = self.pending.pop(channel_id)
+
+        lines = [f"{member.mention} is now level **{level}**!" for member, level in list(levels.values())[:self.limit]]
+        if len(levels) > self.limit:
+            lines.append(f"...and **{len(levels) - self.limit}** more.")
+
+        embed = discord.Embed(
+            title='Yay!',
+            description="\n".join(lines),
+            colour=colors.green
+        )
+        embed.set_thumbnail(
+            url='https://chpic.su/_data/stickers/p/Paimon_Emoji_Set/Paimon_Emoji_Set_006.webp'
+        )
+
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as error:
+            console_log(f"HEIST: Could not announce {len(levels)} level ups in {channel_id}: {error}")
+
+    def cancel(self):
+        for task in list(self.tasks):
+            task.cancel()
+        self.pending.clear()
+
+class InsufficientAccess(commands.CommandError):
+    """The access level is insufficient."""
+    pass
 
 class Heist(commands.Cog):
     def __init__(self, client):
         self.client = client
+        self.config = client.config
+        self.announcements = Announcements()
+
+    def cog_unload(self):
+        self.announcements.cancel()
+
+    async def cog_before_invoke(self, ctx):
+        # the game of a guild is made by its first command, databases are opened
+        # when needed. the curve is read every time so edits apply without a restart
+        config = await self.config.aload(ctx.guild.id)
+
+        game = games.get(ctx.guild.id)
+        if game is None:
+            game = games[ctx.guild.id] = AsyncGame(Game(ctx.guild.id))
+        game.curve = await config.asetting(__name__, 'level_curve')
 
     async def cog_command_error(self, ctx, error):
         await ctx.send(
@@ -28,105 +188,22 @@ class Heist(commands.Cog):
             ctx.command.reset_cooldown(ctx)
             console_log(f"Command '{ctx.command}' for {ctx.guild.name} has been reset due to an error")
 
-    async def levelup(self, ctx):
-        embed = discord.Embed(
-            title='Yay!',
-            description=f'{ctx.author.mention} has leveled up!',
-            colour=colors.green
-        )
-        embed.set_thumbnail(
-            url='https://chpic.su/_data/stickers/p/Paimon_Emoji_Set/Paimon_Emoji_Set_006.webp'
-        )
-        await ctx.send(embed=embed)
-
-    @commands.Cog.listener()
-    async def on_ready(self):
-        # init game
-        for guild in self.client.guilds:
-            games[guild.id] = Game(guild.id)
+    def levelup(self, ctx, level):
+        self.announcements.levelup(ctx.channel, ctx.author, level)
 
     @commands.command()
     async def economy(self, ctx):
-        commands = {
-            "register": "Grants you access to Mona Heist.",
-            "(w)ork": "Earn money and exp every five minutes. Scales with level.",
-            "rob @user": "Take someone's money. Has a chance to get caught and fined instead.",
-            "donate @user <amount>": "Give someone cash and earn exp. Has a cooldown of 30 seconds.",
-            "gamble <amount>": "Get a chance to double your money, or lose double.",
-            "charity <amount>": "Donate to charity and receive exp.",
-            "profile @user": "View user profile."
-        }
-        perk_commands = {
-            "perk": "View your perks.",
-            "shop": "List of perks that can be purchased.",
-            "buy <ID> <amount>": "Buy perks from the shop"			
-        }
-        bank_commands = {
-            "bank": "View your bank balance.",
-            "(dep)osit <amount>": "Deposit cash to your bank account.",
-            "take <amount>": "Take cash from your bank account.",
-            "transfer @user <amount>": "Transfer money to another user's bank account."
-        }
-
-        frontpage = discord.Embed(
-            colour=colors.blue,
-            title="Mona Heist",
-            description="Economy System v2.1"
-        )
-        frontpage.add_field(
-            name="Commands",
-            value="".join([f"**${key}**\n{value}\n\n" for key, value in commands.items()])
-        )
-        frontpage.set_thumbnail(url="https://i.imgur.com/nGaddfb.png")
-
-        perks = discord.Embed(
-            colour=colors.blue,
-            title="Mona Heist",
-            description="Economy System v2.1"
-        )
-        perks.add_field(
-            name="Perk Commands",
-            value="".join([f"**${key}**\n{value}\n\n" for key, value in perk_commands.items()])
-        )
-        perks.set_thumbnail(url="https://i.imgur.com/nGaddfb.png")
-
-        bank = discord.Embed(
-            colour=colors.blue,
-            title="Mona Heist",
-            description="Economy System v2.1"
-        )
-        bank.add_field(
-            name="Bank Commands",
-            value="".join([f"**${key}**\n{value}\n\n" for key, value in bank_commands.items()])
-        )
-        bank.set_thumbnail(url="https://i.imgur.com/nGaddfb.png")
-
-        embeds = [frontpage, perks, bank]
         paginator = DiscordUtils.Pagination.AutoEmbedPaginator(ctx)
-        
-        await paginator.run(embeds)
+
+        await paginator.run(help_pages)
 
     @commands.command()
     async def register(self, ctx):
         game = games.get(ctx.guild.id)
 
-        user = game.register(ctx.author.id)
+        user = await game.register(ctx.author.id)
 
-        if not user:
-            embed = discord.Embed(
-                colour=colors.red,
-                title='Yikes!',
-                description='It seems that you are already registered.'
-            )
-            embed.set_thumbnail(url='https://chpic.su/_data/stickers/p/Paimon_Emoji_Set/Paimon_Emoji_Set_012.webp')
-        else:
-            embed = discord.Embed(
-                colour=colors.green,
-                title='Nice!',
-                description='You are now registered!'
-            )
-            embed.set_thumbnail(url='https://chpic.su/_data/stickers/p/Paimon_Emoji_Set/Paimon_Emoji_Set_005.webp')
-        await ctx.send(embed=embed)
+        await ctx.send(embed=registered if user else already_registered)
 
     @commands.command(aliases=["me", "stats"])
     async def profile(self, ctx, member: discord.Member = None):
@@ -134,29 +211,62 @@ class Heist(commands.Cog):
             ctx.author = member
 
         game = games.get(ctx.guild.id)
-        user = User.get(game.conn, game.c, ctx.author.id)
+        user = await game.user(ctx.author.id)
 
         if user:
             embed = discord.Embed(title="User Profile", description=f"Showing information for: {ctx.author.mention}", colour=colors.blue, timestamp=ctx.message.created_at)
-            embed.add_field(name='Experience', value=f'{user.exp}/{user.exp_to_levelup}', inline=True)
+            embed.add_field(name='Experience', value=f'{user.exp}/{game.curve.threshold(user.level)}', inline=True)
             embed.add_field(name='Level', value=user.level, inline=True)
             embed.add_field(name='Cash', value=f"${user.cash}", inline=True)
             embed.set_thumbnail(url=ctx.author.avatar_url)
             await ctx.send(embed=embed)
 
+    @commands.command(aliases=["lb"])
+    async def leaderboard(self, ctx, board='cash', page: int = 1):
+        board = board.lower()
+
+        game = games.get(ctx.guild.id)
+        data = await game.leaderboard(board, page, ctx.author.id)
+
+        lines = []
+        for rank, uid, score in data["entries"]:
+            member = ctx.guild.get_member(uid)
+            name = (member.nick if member.nick else member.name) if member else f"<@{uid}>"
+
+            if board == 'level':
+                # level and exp are packed into one score
+                value = f"Level {score >> 32} ({score & 0xFFFFFFFF} exp)"
+            else:
+                value = f"${score}"
+
+            lines.append(f"**{rank}.** {name} - {value}")
+
+        embed = discord.Embed(
+            title = f"{board.capitalize()} Leaderboard",
+            description = "\n".join(lines) or "Nobody has registered yet.",
+            colour = colors.gold
+        )
+
+        footer = f"Page {data['page']}/{data['pages']}"
+        if data["rank"]:
+            footer = footer + f" | Your rank: #{data['rank']} of {data['total']}"
+        embed.set_footer(text=footer)
+
+        await ctx.send(embed=embed)
+
     @commands.command(aliases=["w"])
     @commands.cooldown(1, 300, commands.BucketType.member)
     async def work(self, ctx):
         game = games.get(ctx.guild.id)
         
-        data = game.work(ctx.author.id)
+        data = await game.work(ctx.author.id)
         amount = data.get('amount')
         cash = data.get('cash')
         exp = data.get('exp')
         levelup = data.get('levelup')
 
         if levelup:
-            await self.levelup(ctx)
+            self.levelup(ctx, data.get('level'))
         
         embed = discord.Embed(
             description = f'You have earned **${amount}** and **{exp}** exp. Your new balance is **${cash}**.',
@@ -175,15 +285,10 @@ class Heist(commands.Cog):
         name = member.nick if member.nick else member.name
 
         if member == ctx.author:
-            await ctx.send(
-                embed = discord.Embed(
-                    description = "You cannot rob yourself.",
-                    colour = colors.red
-                )
-            )
+            await ctx.send(embed=rob_self)
             return
 
-        data = game.rob(ctx.author.id, member.id)
+        data = await game.rob(ctx.author.id, member.id)
         failed = data.get('failed')
         amount = data.get('amount')
         cash = data.get('cash')
@@ -191,7 +296,7 @@ class Heist(commands.Cog):
         levelup = data.get('levelup')
 
         if levelup:
-            await self.levelup(ctx)
+            self.levelup(ctx, data.get('level'))
 
         if failed:
             embed = discord.Embed(
@@ -219,12 +324,12 @@ class Heist(commands.Cog):
 
         amount = int(amount)
 
-        data = game.donate(ctx.author.id, member.id, amount)
+        data = await game.donate(ctx.author.id, member.id, amount)
         exp = data.get('exp')
         levelup = data.get('levelup')
 
         if levelup:
-            await self.levelup(ctx)
+            self.levelup(ctx, data.get('level'))
 
         await ctx.send(
             embed = discord.Embed(
@@ -238,12 +343,12 @@ class Heist(commands.Cog):
         game = games.get(ctx.guild.id)
         name = ctx.author.nick if ctx.author.nick else ctx.author.name
 
-        data = game.charity(ctx.author.id, amount)
+        data = await game.charity(ctx.author.id, amount)
         exp = data.get('exp')
 
         levelup = data.get('levelup')
         if levelup:
-            await self.levelup(ctx)
+            self.levelup(ctx, data.get('level'))
 
         await ctx.send(
             embed = discord.Embed(
@@ -265,54 +370,46 @@ class Heist(commands.Cog):
         x_emoji = '❌'
 
         verify = await ctx.send(embed=embed)
-        await verify.add_reaction(check_emoji)
-        await verify.add_reaction(x_emoji)
 
-        try:
-            reaction, user = await self.client.wait_for(
-                'reaction_add',
-                timeout=10,
-                check=lambda reaction, user: user == ctx.author
-            )
-            if str(reaction.emoji) == x_emoji:
-                await verify.delete()
-                embed = discord.Embed(
-                    description = "Gamble cancelled.",
-                    colour = colors.red
-                )
+        with self.client.confirmations.expect('reaction', verify.id, ctx.author.id, (check_emoji, x_emoji)) as answer:
+            await verify.add_reaction(check_emoji)
+            await verify.add_reaction(x_emoji)
 
-                await ctx.send(embed=embed, delete_after=10)
+            try:
+                emoji = await asyncio.wait_for(answer, timeout=10)
+            except asyncio.TimeoutError:
+                await verify.delete()
+                await ctx.send('Cancelling due to timeout.')
                 return
 
-            if str(reaction.emoji) == check_emoji:
-                await verify.delete()
+        await verify.delete()
+
+        if emoji == x_emoji:
+            await ctx.send(embed=gamble_cancelled, delete_after=10)
+            return
+
+        data = await game.gamble(ctx.author.id, amount)
+        win = data.get('win')
+        amount = data.get('amount')
 
-                data = game.gamble(ctx.author.id, amount)
-                win = data.get('win')
-                amount = data.get('amount')
-
-                if win:
-                    end_msg = discord.Embed(
-                        description=f'Congratulations, {ctx.author.mention}! You gambled and won **${amount}**.',
-                        colour = colors.gold
-                    )
-                else:
-                    end_msg = discord.Embed(
-                        description=f'Yikes, {ctx.author.mention}! You gambled and lost **${amount}**.',
-                        colour = colors.red
-                    )
-
-                end_msg.set_author(name=ctx.author.nick if ctx.author.nick else ctx.author.name, icon_url=ctx.author.avatar_url)
-                await ctx.send(embed=end_msg)
-        except asyncio.TimeoutError:
-            await verify.delete()
-            await ctx.send('Cancelling due to timeout.')
+        if win:
+            end_msg = discord.Embed(
+                description=f'Congratulations, {ctx.author.mention}! You gambled and won **${amount}**.',
+                colour = colors.gold
+            )
+        else:
+            end_msg = discord.Embed(
+                description=f'Yikes, {ctx.author.mention}! You gambled and lost **${amount}**.',
+                colour = colors.red
+            )
+
+        end_msg.set_author(name=ctx.author.nick if ctx.author.nick else ctx.author.name, icon_url=ctx.author.avatar_url)
+        await ctx.send(embed=end_msg)
 
     @commands.command(aliases=["perk"])
     async def myperks(self, ctx):
         game = games.get(ctx.guild.id)
-        user = User.get(game.conn, game.c, ctx.author.id)
-        user.perks = Perk.get(game.conn, game.c, ctx.author.id)
+        perks = await game.perks(ctx.author.id)
 
         embed = discord.Embed(
 				title="Perk Information",
@@ -322,12 +419,12 @@ class Heist(commands.Cog):
 			)
         embed.set_thumbnail(url=ctx.author.avatar_url)
         embed.add_field(
-            name=f"Tactical Robbery `x{user.perks.rob}`",
+            name=f"Tactical Robbery `x{perks.rob}`",
             value="Get caught less in **`$rob`**",
             inline=False
         )
         embed.add_field(
-            name=f"Energy Drink `x{user.perks.work}`",
+            name=f"Energy Drink `x{perks.work}`",
             value="Earn more cash in **`$work`**",
             inline=False
         )
@@ -341,10 +438,10 @@ class Heist(commands.Cog):
 
         if item.lower() == 'rob':
             item_name = 'Tactical Robbery'
-            data = game.buy_rob(ctx.author.id, amount)
+            data = await game.buy_rob(ctx.author.id, amount)
         if item.lower() == 'work':
             item_name = 'Energy Drink'
-            data = game.buy_work(ctx.author.id, amount)
+            data = await game.buy_work(ctx.author.id, amount)
 
         await ctx.send(
             embed = discord.Embed(
@@ -356,34 +453,17 @@ class Heist(commands.Cog):
     @commands.command()
     async def shop(self, ctx):
         game = games.get(ctx.guild.id)
-        user = User.get(game.conn, game.c, ctx.author.id)
+        user = await game.user(ctx.author.id)
 
         if not user:
             raise GameExceptions.UserNotFound("You must be registered to do this.")
 
-        shop_items = {
-            'work': {'price': '10', 'code': 'work', 'name': 'Energy Drink', 'desc': 'Increases cash and exp gained from `$work`.'},
-            'rob': {'price': '50', 'code': 'rob', 'name': 'Tactical Robbery', 'desc': 'Reduces the chance of failing in `$rob`.'}
-        }
-
-        embed = discord.Embed(
-            title = 'Perk Shop',
-            description = "".join(
-                [f"Code: `{item.get('code')}` | **{item.get('name')}** `${item.get('price')}`\n{item.get('desc')}\n\n" for key, item in shop_items.items()]
-            ),
-            colour = colors.blue
-        )
-
-        embed.set_footer(
-            text="Use [$buy <code> <qty>] to buy perks."
-        )
-
-        await ctx.send(embed=embed)
+        await ctx.send(embed=shop)
 
     @commands.command()
     async def bank(self, ctx):
         game = games.get(ctx.guild.id)
-        bank = Bank.get(game.conn, game.c, ctx.author.id)
+        bank = await game.bank(ctx.author.id)
 
         await ctx.send(
             embed = discord.Embed(
@@ -397,10 +477,10 @@ class Heist(commands.Cog):
         game = games.get(ctx.guild.id)
 
         if amount == 'all':
-            user = User.get(game.conn, game.c, ctx.author.id)
+            user = await game.user(ctx.author.id)
             amount = user.cash
 
-        amount = game.deposit(ctx.author.id, amount)
+        amount = await game.deposit(ctx.author.id, amount)
 
         await ctx.send(
             embed = discord.Embed(
@@ -412,11 +492,11 @@ class Heist(commands.Cog):
     @commands.command(aliases=["take"])
     async def withdraw(self, ctx, amount):
         game = games.get(ctx.guild.id)
-        amount = game.withdraw(ctx.author.id, amount)
-
         if amount == 'all':
-            user = User.get(game.conn, game.c, ctx.author.id)
-            amount = user.cash
+            bank = await game.bank(ctx.author.id)
+            amount = bank.balance
+
+        amount = await game.withdraw(ctx.author.id, amount)
 
         await ctx.send(
             embed = discord.Embed(
@@ -432,7 +512,7 @@ class Heist(commands.Cog):
         sender_name = ctx.author.nick if ctx.author.nick else ctx.author.name
         receiver_name = member.nick if member.nick else member.name
 
-        amount = game.transfer(ctx.author.id, member.id, amount)
+        amount = await game.transfer(ctx.author.id, member.id, amount)
 
         await ctx.send(
             embed = discord.Embed(
@@ -440,6 +520,132 @@ class Heist(commands.Cog):
                 colour = colors.gold
             )
         )
-        
+
+    @commands.command(aliases=["log"])
+    async def history(self, ctx, member: discord.Member = None):
+        member = member or ctx.author
+
+        game = games.get(ctx.guild.id)
+        entries = await game.history(member.id)
+
+        lines = []
+        for entry in entries:
+            counterparty = f" with <@{entry['counterparty']}>" if entry['counterparty'] else ""
+            lines.append(f"`{entry['delta']:+}` {entry['account']} - {entry['kind']}{counterparty} <t:{entry['ts'] // 1000}:R>")
+
+        await ctx.send(
+            embed = discord.Embed(
+                title = f"{member.nick if member.nick else member.name}'s Transactions",
+                description = "\n".join(lines) or "No transactions yet.",
+                colour = colors.gold
+            )
+        )
+
+    @commands.command()
+    @commands.check(is_whitelisted)
+    async def payout(self, ctx, amount: int, role: discord.Role = None):
+        required_access = 4
+
+        if not await whitelist_level(ctx, required_access):
+            raise InsufficientAccess("You do not have access to this command.")
+
+        game = games.get(ctx.guild.id)
+        members = role.members if role else ctx.guild.members
+
+        start = time.perf_counter()
+        count = await game.bulk_add_cash([member.id for member in members], amount)
+        elapsed = time.perf_counter() - start
+
+        console_log(f"HEIST: Paid ${amount} to {count} users in {ctx.guild.name} in {elapsed * 1000:.0f}ms.")
+
+        await ctx.send(
+            embed = discord.Embed(
+                description = f"Paid **${amount}** to **{count}** registered members{f' of {role.mention}' if role else ''}.",
+                colour = colors.gold
+            )
+        )
+
+    @commands.command()
+    @commands.check(is_whitelisted)
+    async def resetaccounts(self, ctx, target: typing.Union[discord.Member, str]):
+        required_access = 5
+
+        if not await whitelist_level(ctx, required_access):
+            raise InsufficientAccess("You do not have access to this command.")
+
+        # resetting the whole guild has to be asked for by name
+        if not isinstance(target, discord.Member) and target != 'everyone':
+            raise commands.BadArgument("Mention a user, or use **everyone** to reset every account.")
+
+        game = games.get(ctx.guild.id)
+        count = await game.bulk_reset([target.id] if isinstance(target, discord.Member) else None)
+
+        console_log(f"HEIST: {ctx.author.id} reset {count} accounts in {ctx.guild.name}.")
+
+        await ctx.send(
+            embed = discord.Embed(
+                description = f"Reset **{count}** account{'' if count == 1 else 's'} to level 1 with no cash, perks or bank balance.",
+                colour = colors.red
+            )
+        )
+
+    @commands.command()
+    @commands.check(is_whitelisted)
+    async def importaccounts(self, ctx):
+        required_access = 5
+
+        if not await whitelist_level(ctx, required_access):
+            raise InsufficientAccess("You do not have access to this command.")
+
+        if not ctx.message.attachments:
+            raise GameExceptions.InvalidImport("Attach a .csv or .json file with a uid column.")
+
+        attachment = ctx.message.attachments[0]
+        format = attachment.filename.rsplit('.', 1)[-1].lower()
+        data = await attachment.read()
+
+        game = games.get(ctx.guild.id)
+
+        start = time.perf_counter()
+        count = await game.import_accounts(io.StringIO(data.decode('utf-8-sig')), format)
+        elapsed = time.perf_counter() - start
+
+        console_log(f"HEIST: Imported {count} accounts into {ctx.guild.name} in {elapsed * 1000:.0f}ms.")
+
+        await ctx.send(
+            embed = discord.Embed(
+                description = f"Imported **{count}** accounts from **{attachment.filename}**.",
+                colour = colors.gold
+            )
+        )
+
+    @commands.command()
+    @commands.check(is_whitelisted)
+    async def verifyledger(self, ctx, mode=None):
+        required_access = 5
+
+        if not await whitelist_level(ctx, required_access):
+            raise InsufficientAccess("You do not have access to this command.")
+
+        game = games.get(ctx.guild.id)
+
+        start = time.perf_counter()
+        data = await game.verify_ledger(mode == 'repair')
+        elapsed = time.perf_counter() - start
+
+        console_log(f"HEIST: Verified {data['checked']} accounts against the ledger in {ctx.guild.name} in {elapsed * 1000:.0f}ms, {data['mismatches']} mismatched.")
+
+        lines = [f"<@{uid}>: ${cash} cash, ${balance} bank, ledger says ${expected_cash} and ${expected_balance}" for uid, (cash, balance), (expected_cash, expected_balance) in data["sample"]]
+        if data["repaired"] and data["mismatches"]:
+            lines.append("\nBalances were set to the ledger totals.")
+
+        await ctx.send(
+            embed = discord.Embed(
+                title = f"Checked {data['checked']} accounts, {data['mismatches']} mismatched",
+                description = "\n".join(lines) or "Every balance matches the ledger.",
+                colour = colors.red if data["mismatches"] else colors.gold
+            )
+        )
+
 def setup(client):
     client.add_cog(Heist(client))
\ No newline at end of file
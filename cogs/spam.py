@@ -6,37 +6,59 @@ from datetime import datetime, timedelta
 from discord.ext import commands
 
 from logger import console_log
+from config import Setting, register_settings, bus
 
 settings = {
-    "message_pool": "5",
-    "trigger_time_delta": "1500"
+    "message_pool": Setting(int, 5),
+    "trigger_time_delta": Setting(int, 1500)
 }
+register_settings(__name__, settings)
 
 messages = {}
+# guild id -> (message_pool, trigger_time_delta), dropped when the config changes
+limits = {}
+# guild id -> config changes seen, bumped by on_config_change
+generations = {}
 
 class AntiSpam(commands.Cog):
     def __init__(self, client):
         self.client = client
         self.config = client.config
 
-    @commands.Cog.listener()
-    async def on_ready(self):
-        # init config data
-        for guild in self.client.guilds:
-            for key, value in settings.items():
-                if not self.config[guild.id].get(__name__, key):
-                    self.config[guild.id].set(__name__, key, value)
+        bus.subscribe(self.on_config_change, __name__)
+
+    def cog_unload(self):
+        bus.unsubscribe(self.on_config_change, __name__)
+
+    def on_config_change(self, guild_id, section, key, old, new):
+        generations[guild_id] = generations.get(guild_id, 0) + 1
+        limits.pop(guild_id, None)
+
+    async def get_limits(self, guild):
+        # a due reload publishes edits made outside the bot, which clears limits
+        config = await self.config.aload(guild.id)
+
+        values = limits.get(guild.id)
+        if values is None:
+            generation = generations.get(guild.id, 0)
+            values = (
+                await config.asetting(__name__, 'message_pool'),
+                await config.asetting(__name__, 'trigger_time_delta')
+            )
+
+            # stored first and checked after, so a change from another thread is never lost
+            limits[guild.id] = values
+            if generations.get(guild.id, 0) != generation:
+                limits.pop(guild.id, None)
+        return values
 
     @commands.Cog.listener()
     async def on_message(self, message):
         guild = message.guild
         author = message.author
 
-        config = self.config[guild.id]
-
         # init params
-        trigger_time_delta = config.getint(__name__, 'trigger_time_delta')
-        message_pool = config.getint(__name__, 'message_pool')
+        message_pool, trigger_time_delta = await self.get_limits(guild)
         current_time = datetime.now().timestamp() * 1000
 
         # ignore if bot
@@ -6,10 +6,12 @@ import colors
 
 from discord.ext import commands
 from logger import console_log
+from config import Setting, register_settings
 
 settings = {
-    'voice_auto_disconnect': 'True'
+    'voice_auto_disconnect': Setting(bool, True)
 }
+register_settings(__name__, settings)
 
 music = DiscordUtils.Music()
 channels = {}
@@ -50,12 +52,6 @@ class Voice(commands.Cog):
 
         self.players = {}
 
-        # init config data for this cog
-        for guild in self.client.guilds:
-            for key, value in settings.items():
-                if not self.config[guild.id].get(__name__, key):
-                    self.config[guild.id].set(__name__, key, value)
-
     async def send_error_message(self, ctx, error):
         await ctx.send(
             embed = discord.Embed(
@@ -74,9 +70,9 @@ class Voice(commands.Cog):
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
-        config = self.config[member.guild.id]
+        config = await self.config.aload(member.guild.id)
         channel = channels.get(member.guild.id)
-        auto_disconnect = config.getboolean(__name__, 'voice_auto_disconnect')
+        auto_disconnect = await config.asetting(__name__, 'voice_auto_disconnect')
         guild = self.client.get_guild(member.guild.id)
 
         if not guild.voice_client:
@@ -106,10 +102,10 @@ class Voice(commands.Cog):
 
     @commands.command(aliases=['toggleadc'])
     async def toggleautodisconnect(self, ctx):
-        config = self.config[ctx.guild.id]
+        config = await self.config.aload(ctx.guild.id)
 
-        value = config.getboolean(__name__, 'voice_auto_disconnect')
-        config.set(__name__, 'voice_auto_disconnect', False if value else True)
+        value = await config.asetting(__name__, 'voice_auto_disconnect')
+        await config.aset(__name__, 'voice_auto_disconnect', False if value else True)
 
         embed = discord.Embed(
             colour=colors.blue,
@@ -407,26 +403,25 @@ class Voice(commands.Cog):
     async def fave(self, ctx, *, url=None):
         if url:
             embed = discord.Embed(title="Enter song title", description="Use alphanumber characters only.")
-            request = await ctx.send(embed=embed)
 
-            try:
-                msg = await self.client.wait_for(
-                    'message',
-                    timeout=60,
-                    check=lambda message: message.author == ctx.author and message.channel == ctx.channel
-                )
-                if msg:
-                    with open(f"playlists/{ctx.author.id}.txt", 'a') as f:
-                        f.write(f"{msg.content}<url>{url}\n")
+            # the author's next message in this channel is the title
+            with self.client.confirmations.expect('message', (ctx.channel.id, ctx.author.id), ctx.author.id) as answer:
+                request = await ctx.send(embed=embed)
 
+                try:
+                    msg = await asyncio.wait_for(answer, timeout=60)
+                except asyncio.TimeoutError:
                     await request.delete()
-                    await msg.delete()
-                    await ctx.send(f"Added **{msg.content}** to your favorites.")
+                    await ctx.send("Cancelling due to timeout")
                     return
-            except asyncio.TimeoutError:
-                await request.delete()
-                await ctx.send("Cancelling due to timeout")
-                return
+
+            with open(f"playlists/{ctx.author.id}.txt", 'a') as f:
+                f.write(f"{msg.content}<url>{url}\n")
+
+            await request.delete()
+            await msg.delete()
+            await ctx.send(f"Added **{msg.content}** to your favorites.")
+            return
 
         player = music.get_player(guild_id=ctx.guild.id)
         if not player:
@@ -28,10 +28,10 @@ class Whitelist(commands.Cog):
     @commands.command(aliases=["wl"])
     @commands.check(is_whitelisted)
     async def whitelist(self, ctx, member: discord.Member, access=0):
-        config = self.config[ctx.guild.id]
+        config = await self.config.aload(ctx.guild.id)
         name = member.nick if member.nick else member.name
 
-        author_level = config.getint(__name__, ctx.author.id)
+        author_level = await config.agetint(__name__, ctx.author.id)
         access = int(access)
 
         if ctx.author == member:
@@ -53,7 +53,7 @@ class Whitelist(commands.Cog):
             )
             return
 
-        config.set(__name__, member.id, access)
+        await config.aset(__name__, member.id, access)
 
         await ctx.send(
             embed = discord.Embed(
@@ -65,11 +65,11 @@ class Whitelist(commands.Cog):
     @commands.command(aliases=["unwl"])
     @commands.check(is_whitelisted)
     async def unwhitelist(self, ctx, member: discord.Member):
-        config = self.config[ctx.guild.id]
+        config = await self.config.aload(ctx.guild.id)
         name = member.nick if member.nick else member.name
 
-        author_level = config.getint(__name__, ctx.author.id)
-        target_level = config.getint(__name__, member.id)
+        author_level = await config.agetint(__name__, ctx.author.id)
+        target_level = await config.agetint(__name__, member.id)
 
         if ctx.author == member:
             await ctx.send(
@@ -90,7 +90,7 @@ class Whitelist(commands.Cog):
             )
             return
 
-        config.delete(__name__, member.id)
+        await config.adelete(__name__, member.id)
 
         await ctx.send(
             embed = discord.Embed(
@@ -101,9 +101,9 @@ class Whitelist(commands.Cog):
     
     @commands.command()
     async def myaccess(self, ctx):
-        config = self.config[ctx.guild.id]
+        config = await self.config.aload(ctx.guild.id)
 
-        access = config.get(__name__, ctx.author.id)
+        access = await config.aget(__name__, ctx.author.id)
 
         await ctx.send(
             embed = discord.Embed(
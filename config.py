@@ -1,61 +1,847 @@
+import os
+import io
+import mmap
+import time
+import atexit
+import struct
+import sqlite3
+import asyncio
+import weakref
+import tempfile
+import threading
+
+from glob import glob
+from contextlib import contextmanager, asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser
+from logger import console_log
+
+try:
+	import fcntl
+except ImportError:
+	fcntl = None
+	import msvcrt
+
+# configs with pending changes, flushed on interpreter exit
+pending = weakref.WeakSet()
+
+# disk work requested from coroutines runs here, never on the event loop
+executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='config')
+
+class Flusher:
+	# single background thread that writes configs once their delay expires
+	def __init__(self):
+		self.due = {}
+		self.condition = threading.Condition()
+		self.thread = None
+
+	def schedule(self, config, delay):
+		with self.condition:
+			if config in self.due:
+				return
+
+			self.due[config] = time.monotonic() + delay
+
+			if not self.thread:
+				self.thread = threading.Thread(target=self.run, name='config-flusher', daemon=True)
+				self.thread.start()
+
+			self.condition.notify()
+
+	def cancel(self, config):
+		with self.condition:
+			self.due.pop(config, None)
+
+	def run(self):
+		while True:
+			with self.condition:
+				now = time.monotonic()
+				ready = [config for config, deadline in self.due.items() if deadline <= now]
+
+				if not ready:
+					timeout = min(self.due.values()) - now if self.due else None
+					self.condition.wait(timeout)
+					continue
+
+				for config in ready:
+					self.due.pop(config)
+
+			for config in ready:
+				# a failed write must not stop the thread, flush() schedules a retry
+				try:
+					config.flush()
+				except Exception as error:
+					console_log(f"Could not write config for guild {config.guild_id}: {type(error)}: {error}")
+
+flusher = Flusher()
+
+def parse_boolean(value):
+	if value.lower() not in ConfigParser.BOOLEAN_STATES:
+		raise ValueError(f"Not a boolean: {value}")
+	return ConfigParser.BOOLEAN_STATES[value.lower()]
+
+class Setting:
+	# a typed config key with a default that is never written to disk
+	parsers = {bool: parse_boolean}
+
+	def __init__(self, type, default=None):
+		self.type = type
+		self.default = default
+		self.parse = self.parsers.get(type, type)
+
+# section -> {key: Setting}, declared once by each cog
+schema = {}
+missing = object()
+
+def register_settings(section, settings):
+	schema[section] = {key.lower(): setting for key, setting in settings.items()}
+
+class ConfigStats:
+	# counters and latency histograms for config access, shown by $configstats
+	buckets = 24
+	# read, hit, miss, write
+	fields = 4
+
+	def __init__(self):
+		self.enabled = True
+		self.reset()
+
+	def reset(self):
+		# (section, key) -> [reads, hits, misses, writes]
+		self.counters = {}
+		# guild_id -> number of reloads from the store
+		self.reloads = {}
+		# operation -> count per bucket, bucket n holds latencies below 2**n microseconds
+		self.histograms = {}
+		self.started = time.monotonic()
+
+	def observe(self, operation, elapsed):
+		bucket = min(int(elapsed * 1000000).bit_length(), self.buckets - 1)
+		histogram = self.histograms.get(operation)
+		if histogram is None:
+			histogram = self.histograms.setdefault(operation, [0] * self.buckets)
+		histogram[bucket] += 1
+
+	def counter(self, section, key):
+		counter = self.counters.get((section, key))
+		if counter is None:
+			counter = self.counters.setdefault((section, key), [0] * self.fields)
+		return counter
+
+	def read(self, section, key, hit, elapsed):
+		if not self.enabled:
+			return
+		counter = self.counter(section, key)
+		counter[0] += 1
+		counter[1 if hit else 2] += 1
+		self.observe('read', elapsed)
+
+	def write(self, section, key, elapsed):
+		if not self.enabled:
+			return
+		self.counter(section, key)[3] += 1
+		self.observe('write', elapsed)
+
+	def reload(self, guild_id, elapsed):
+		if not self.enabled:
+			return
+		self.reloads[guild_id] = self.reloads.get(guild_id, 0) + 1
+		self.observe('reload', elapsed)
+
+	def flush(self, elapsed):
+		if not self.enabled:
+			return
+		self.observe('flush', elapsed)
+
+	def percentile(self, operation, fraction):
+		# upper bound of the bucket holding the given fraction, in microseconds
+		histogram = self.histograms.get(operation)
+		if not histogram:
+			return None
+
+		target = sum(histogram) * fraction
+		seen = 0
+		for bucket, count in enumerate(histogram):
+			seen = seen + count
+			if count and seen >= target:
+				return 2 ** bucket
+
+	def totals(self):
+		totals = [0] * self.fields
+		for counter in list(self.counters.values()):
+			for index, value in enumerate(counter):
+				totals[index] = totals[index] + value
+		return totals
+
+	def top(self, count=10):
+		return sorted(self.counters.items(), key=lambda item: item[1][0] + item[1][3], reverse=True)[:count]
+
+	def latencies(self):
+		return {
+			operation: (sum(histogram), self.percentile(operation, 0.5), self.percentile(operation, 0.99))
+			for operation, histogram in list(self.histograms.items())
+		}
+
+	def summary(self):
+		reads, hits, misses, writes = self.totals()
+		minutes = (time.monotonic() - self.started) / 60
+		latency = ", ".join(
+			f"{operation} p50<{p50}us p99<{p99}us"
+			for operation, (count, p50, p99) in self.latencies().items()
+		)
+		return (
+			f"Config stats over {minutes:.1f}m: {reads} reads ({hits} hits, {misses} misses), "
+			f"{writes} writes, {sum(self.reloads.values())} reloads. {latency}"
+		)
+
+stats = ConfigStats()
+
+class ConfigBus:
+	# delivers (guild_id, section, key, old, new) to subscribers after a value changes.
+	# callbacks run on whichever thread made or noticed the change, keep them short.
+	def __init__(self):
+		self.subscribers = {}
+
+	def subscribe(self, callback, section=None):
+		self.subscribers.setdefault(section, []).append(callback)
+
+	def unsubscribe(self, callback, section=None):
+		callbacks = self.subscribers.get(section, [])
+		if callback in callbacks:
+			callbacks.remove(callback)
+
+	def publish(self, events):
+		for guild_id, section, key, old, new in events:
+			for callback in self.subscribers.get(section, []) + self.subscribers.get(None, []):
+				try:
+					callback(guild_id, section, key, old, new)
+				except Exception as error:
+					console_log(f"Config subscriber {callback} failed: {type(error)}: {error}")
+
+bus = ConfigBus()
+
+class ProcessLock:
+	# advisory lock on a file, shared by every bot process using the same directory
+	def __init__(self, path):
+		self.path = path
+		self.lock = threading.Lock()
+		self.file = None
+
+	def __enter__(self):
+		self.lock.acquire()
+		try:
+			self.file = open(self.path, 'a+b')
+			if fcntl:
+				fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+			else:
+				self.file.seek(0)
+				while True:
+					try:
+						msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+						break
+					except OSError:
+						continue
+		except BaseException:
+			if self.file:
+				self.file.close()
+			self.lock.release()
+			raise
+		return self
+
+	def __exit__(self, *exc):
+		try:
+			if fcntl:
+				fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+			else:
+				self.file.seek(0)
+				msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+		finally:
+			self.file.close()
+			self.file = None
+			self.lock.release()
+
+class Generation:
+	# counter in a small mmap'd file, bumped by any process after it writes.
+	# readers compare it with the value they last saw to skip checking the store.
+	def __init__(self, path):
+		self.path = path
+		self.lock = ProcessLock(f'{path}.lock')
+
+		with open(path, 'a+b') as f:
+			if f.seek(0, os.SEEK_END) < 8:
+				f.write(bytes(8))
+
+		self.file = open(path, 'r+b')
+		self.map = mmap.mmap(self.file.fileno(), 8)
+
+	def value(self):
+		return struct.unpack_from('<Q', self.map)[0]
+
+	def bump(self):
+		with self.lock:
+			struct.pack_into('<Q', self.map, 0, self.value() + 1)
+
+class IniStore:
+	# one .ini file per guild
+	def __init__(self, path, lock=None, generation=None):
+		self.path = path
+		self.lock = lock
+		self.generation = generation
+
+	def stamp(self):
+		try:
+			st = os.stat(self.path)
+		except FileNotFoundError:
+			return None
+		return (st.st_mtime_ns, st.st_size)
+
+	def read(self):
+		parser = ConfigParser(interpolation=None)
+		parser.read(self.path)
+		return {section: dict(parser.items(section)) for section in parser.sections()}
+
+	def save(self, changes):
+		if not self.lock:
+			return self.merge(changes)
+
+		with self.lock:
+			return self.merge(changes)
+
+	def merge(self, changes):
+		# apply changes on top of the file as it is now, so writes from
+		# other processes since our last read are kept
+		data = self.read()
+		for (section, key), value in changes.items():
+			if value is None:
+				data.get(section, {}).pop(key, None)
+			else:
+				data.setdefault(section, {})[key] = value
+
+		parser = ConfigParser(interpolation=None)
+		parser.read_dict(data)
+
+		text = io.StringIO()
+		parser.write(text)
+
+		# write to a temp file next to the config, then swap it in
+		directory = os.path.dirname(self.path) or '.'
+		fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(self.path), suffix='.tmp')
+		try:
+			with os.fdopen(fd, 'w') as conf:
+				conf.write(text.getvalue())
+				conf.flush()
+				os.fsync(conf.fileno())
+			os.replace(temp_path, self.path)
+		except BaseException:
+			os.remove(temp_path)
+			raise
+
+		if self.generation:
+			self.generation.bump()
+
+		return data, self.stamp()
+
+class SettingsDatabase:
+	# every guild's settings in one sqlite table
+	def __init__(self, path, generation=None):
+		self.path = path
+		self.generation = generation
+		self.lock = threading.Lock()
+		self.conn = sqlite3.connect(path, check_same_thread=False)
+
+		with self.lock:
+			self.conn.execute("PRAGMA journal_mode=WAL")
+			self.conn.execute("PRAGMA synchronous=NORMAL")
+			with self.conn:
+				self.conn.execute("""CREATE TABLE IF NOT EXISTS settings (
+					guild_id INTEGER NOT NULL,
+					section TEXT NOT NULL,
+					key TEXT NOT NULL,
+					value TEXT NOT NULL,
+					PRIMARY KEY (guild_id, section, key)
+				) WITHOUT ROWID""")
+
+	def version(self):
+		# changes whenever another connection commits
+		with self.lock:
+			return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+	def read(self, guild_id):
+		data = {}
+		with self.lock:
+			rows = self.conn.execute("SELECT section, key, value FROM settings WHERE guild_id=?", (guild_id,)).fetchall()
+		for section, key, value in rows:
+			data.setdefault(section, {})[key] = value
+		return data
+
+	def read_all(self):
+		# guild_id -> section -> key -> value, in a single scan
+		data = {}
+		with self.lock:
+			rows = self.conn.execute("SELECT guild_id, section, key, value FROM settings").fetchall()
+		for guild_id, section, key, value in rows:
+			data.setdefault(guild_id, {}).setdefault(section, {})[key] = value
+		return data
+
+	def save(self, guild_id, changes):
+		upserts = [(guild_id, section, key, value) for (section, key), value in changes.items() if value is not None]
+		deletes = [(guild_id, section, key) for (section, key), value in changes.items() if value is None]
+
+		with self.lock, self.conn:
+			self.conn.executemany("INSERT OR REPLACE INTO settings VALUES (?, ?, ?, ?)", upserts)
+			self.conn.executemany("DELETE FROM settings WHERE guild_id=? AND section=? AND key=?", deletes)
+
+		if self.generation:
+			self.generation.bump()
+
+	def import_ini(self, directory):
+		# bulk load a directory of <guild_id>.ini files in one transaction
+		files = 0
+		rows = []
+		for path in sorted(glob(f'{directory}/*.ini')):
+			name = os.path.basename(path)[:-4]
+			if not name.isdigit():
+				continue
+
+			files = files + 1
+			for section, values in IniStore(path).read().items():
+				for key, value in values.items():
+					rows.append((int(name), section, key, value))
+
+		with self.lock, self.conn:
+			self.conn.executemany("INSERT OR REPLACE INTO settings VALUES (?, ?, ?, ?)", rows)
+
+		return files, len(rows)
+
+class SqliteStore:
+	def __init__(self, database, guild_id):
+		self.database = database
+		self.guild_id = guild_id
+		self.generation = database.generation
+
+	def stamp(self):
+		return self.database.version()
+
+	def read(self):
+		return self.database.read(self.guild_id)
+
+	def save(self, changes):
+		# sqlite writes only the changed rows, nothing to merge back
+		self.database.save(self.guild_id, changes)
 
 class Config:
-	def __init__(self, config_path):
-		self.config_path = config_path
-		self.config = ConfigParser()
-		self.config.read(config_path)
-
-	def get(self, section, key, fallback=None):
-		section, key = str(section), str(key)
-		self.config.read(self.config_path)
-		value = self.config.get(section, key, fallback=fallback)
+	# seconds between checks of the store for outside edits
+	reload_interval = 1.0
+	# seconds to wait for more changes before writing to the store
+	flush_delay = 0.5
+
+	def __init__(self, store, guild_id=None):
+		if isinstance(store, str):
+			store = IniStore(store)
+
+		self.store = store
+		self.guild_id = guild_id
+		self.data = {}
+		self.stamp = None
+		self.checked = 0
+		# store generation seen at the last check
+		self.seen = None
+
+		# (section, key) -> value, or None when deleted
+		self.changes = {}
+		# (section, key) -> parsed value of a schema setting
+		self.typed = {}
+		self.lock = threading.RLock()
+		self.writing = threading.Lock()
+		self.batching = 0
+
+		# the store is read on first use, not on construction
+		self.loaded = False
+
+	def load(self):
+		# read the store once and keep a plain dict copy for lookups
+		start = time.perf_counter()
+		self.seen = self.generation()
+		stamp = self.store.stamp()
+		events = self.apply(self.store.read(), stamp)
+		stats.reload(self.guild_id, time.perf_counter() - start)
+		return events
+
+	def apply(self, data, stamp):
+		with self.lock:
+			# re-apply changes that have not been written yet
+			for (section, key), value in self.changes.items():
+				if value is None:
+					data.get(section, {}).pop(key, None)
+				else:
+					data.setdefault(section, {})[key] = value
+
+			events = self.diff(self.data, data) if self.loaded else []
+
+			self.data = data
+			self.typed = {}
+			self.stamp = stamp
+			self.checked = time.monotonic()
+			self.loaded = True
+
+		return events
+
+	def diff(self, old, new):
+		# changes made to the store from outside this process
+		events = []
+		for section in old.keys() | new.keys():
+			before, after = old.get(section, {}), new.get(section, {})
+			for key in before.keys() | after.keys():
+				if before.get(key) != after.get(key):
+					events.append((self.guild_id, section, key, before.get(key), after.get(key)))
+		return events
+
+	def prime(self, data, stamp):
+		# hand over data that was read in bulk, unless already loaded
+		with self.lock:
+			if not self.loaded:
+				self.apply(data, stamp)
+
+	def generation(self):
+		if self.store.generation is None:
+			return None
+		return self.store.generation.value()
+
+	def stale(self, now):
+		# another process wrote since the last check, or the periodic check is due
+		return self.generation() != self.seen or now - self.checked >= self.reload_interval
+
+	def due(self):
+		return not self.loaded or self.stale(time.monotonic())
+
+	def refresh(self):
+		# returns True when the data had to be read from the store
+		if not self.loaded:
+			with self.lock:
+				if not self.loaded:
+					self.load()
+					return True
+			return False
+
+		now = time.monotonic()
+		if not self.stale(now):
+			return False
+
+		with self.lock:
+			self.checked = now
+			self.seen = self.generation()
+			if self.store.stamp() == self.stamp:
+				return False
+			events = self.load()
+
+		bus.publish(events)
+		return True
+
+	def invalidate(self):
+		# force a reload on the next lookup
+		self.stamp = missing
+		self.checked = 0
+
+	def lookup(self, section, key, loaded=False):
+		# loaded is True when the caller already read the store for this lookup
+		start = time.perf_counter()
+		section, key = str(section), str(key).lower()
+
+		loaded = self.refresh() or loaded
+		value = self.data.get(section, {}).get(key)
+
+		stats.read(section, key, not loaded, time.perf_counter() - start)
 		return value
 
-	def getint(self, section, key, fallback=None):
-		section, key = str(section), str(key)
-		self.config.read(self.config_path)
-		value = self.config.getint(section, key, fallback=fallback)
+	def get(self, section, key, fallback=None, loaded=False):
+		value = self.lookup(section, key, loaded)
+		if value is None:
+			return fallback
 		return value
 
-	def getboolean(self, section, key, fallback=None):
-		section, key = str(section), str(key)
-		self.config.read(self.config_path)
-		value = self.config.getboolean(section, key, fallback=fallback)
+	def getint(self, section, key, fallback=None, loaded=False):
+		value = self.lookup(section, key, loaded)
+		if value is None:
+			return fallback
+		return int(value)
+
+	def getboolean(self, section, key, fallback=None, loaded=False):
+		value = self.lookup(section, key, loaded)
+		if value is None:
+			return fallback
+		return parse_boolean(value)
+
+	def setting(self, section, key, loaded=False):
+		# typed value from the schema, parsed once and cached until it changes
+		start = time.perf_counter()
+		section, key = str(section), str(key).lower()
+
+		loaded = self.refresh() or loaded
+		value = self.typed.get((section, key), missing)
+
+		if value is missing:
+			setting = schema[section][key]
+			raw = self.data.get(section, {}).get(key)
+
+			try:
+				value = setting.default if raw is None else setting.parse(raw)
+			except ValueError:
+				value = setting.default
+
+			self.typed[(section, key)] = value
+
+		stats.read(section, key, not loaded, time.perf_counter() - start)
 		return value
 
+	def flush(self):
+		flusher.cancel(self)
+
+		with self.writing:
+			# take the pending changes under the lock, write without holding it
+			with self.lock:
+				if not self.changes:
+					return
+
+				changes = self.changes
+				self.changes = {}
+				pending.discard(self)
+
+			start = time.perf_counter()
+			try:
+				merged = self.store.save(changes)
+			except BaseException:
+				with self.lock:
+					self.changes = {**changes, **self.changes}
+					pending.add(self)
+				flusher.schedule(self, self.flush_delay)
+				raise
+
+			events = []
+			if merged:
+				# the store merged in writes from other processes
+				events = self.apply(*merged)
+			else:
+				stamp = self.store.stamp()
+				with self.lock:
+					self.stamp = stamp
+					self.checked = time.monotonic()
+
+			stats.flush(time.perf_counter() - start)
+			bus.publish(events)
+
+	def schedule(self):
+		pending.add(self)
+
+		if self.batching:
+			return
+
+		flusher.schedule(self, self.flush_delay)
+
+	@contextmanager
+	def batch(self):
+		# hold back writes until the outermost batch exits
+		with self.lock:
+			self.batching = self.batching + 1
+		try:
+			yield self
+		finally:
+			with self.lock:
+				self.batching = self.batching - 1
+				done = not self.batching
+			if done:
+				self.flush()
+
+	async def run(self, func, *args):
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(executor, func, *args)
+
+	async def arefresh(self):
+		# returns True when the data had to be read from the store, like refresh()
+		if self.due():
+			return await self.run(self.refresh)
+		return False
+
+	async def aget(self, section, key, fallback=None):
+		loaded = await self.arefresh()
+		return self.get(section, key, fallback, loaded)
+
+	async def agetint(self, section, key, fallback=None):
+		loaded = await self.arefresh()
+		return self.getint(section, key, fallback, loaded)
+
+	async def agetboolean(self, section, key, fallback=None):
+		loaded = await self.arefresh()
+		return self.getboolean(section, key, fallback, loaded)
+
+	async def asetting(self, section, key):
+		loaded = await self.arefresh()
+		return self.setting(section, key, loaded)
+
+	async def aset(self, section, key, value):
+		await self.arefresh()
+		self.set(section, key, value)
+
+	async def adelete(self, section, key):
+		await self.arefresh()
+		self.delete(section, key)
+
+	async def aflush(self):
+		await self.run(self.flush)
+
+	@asynccontextmanager
+	async def abatch(self):
+		with self.lock:
+			self.batching = self.batching + 1
+		try:
+			yield self
+		finally:
+			with self.lock:
+				self.batching = self.batching - 1
+				done = not self.batching
+			if done:
+				await self.aflush()
+
 	def set(self, section, key, value):
-		key = str(key)
+		start = time.perf_counter()
+		section = str(section)
+		# keys are case-insensitive, like configparser options
+		key = str(key).lower()
 		value = str(value)
 
-		self.config.read(self.config_path)
+		self.refresh()
+
+		with self.lock:
+			old = self.data.get(section, {}).get(key)
+			if old == value:
+				return
 
-		if not (section in self.config.sections()):
-			self.config[section] = {}
+			self.data.setdefault(section, {})[key] = value
+			self.typed.pop((section, key), None)
 
-		self.config[section][key] = value
+			self.changes[(section, key)] = value
+			self.schedule()
 
-		with open(self.config_path, 'w') as conf:
-			self.config.write(conf)
+		stats.write(section, key, time.perf_counter() - start)
+		bus.publish([(self.guild_id, section, key, old, value)])
 
 	def delete(self, section, key):
-		key = str(key)
+		start = time.perf_counter()
+		section = str(section)
+		key = str(key).lower()
 
-		self.config.read(self.config_path)
+		self.refresh()
 
-		if not (section in self.config.sections()):
-			return
+		with self.lock:
+			if key not in self.data.get(section, {}):
+				return
 
-		if not self.get(section, key):
-			return
+			old = self.data[section].pop(key)
+			self.typed.pop((section, key), None)
 
-		self.config[section].pop(key)
+			self.changes[(section, key)] = None
+			self.schedule()
 
-		with open(self.config_path, 'w') as conf:
-			self.config.write(conf)
+		stats.write(section, key, time.perf_counter() - start)
+		bus.publish([(self.guild_id, section, key, old, None)])
 
 	def has_section(self, section):
-		if section in self.config.sections():
+		self.refresh()
+
+		if str(section) in self.data:
 			return True
 		else:
-			return False
\ No newline at end of file
+			return False
+
+class ConfigRegistry:
+	backends = ['ini', 'sqlite']
+
+	def __init__(self, directory, backend='ini'):
+		self.directory = directory
+		self.backend = backend
+		self.database = None
+		self.process_lock = None
+		self.generation = None
+		self.configs = {}
+		self.lock = threading.Lock()
+
+	def configure(self, backend):
+		if backend not in self.backends:
+			raise ValueError(f"Unknown config backend: {backend}")
+		if self.configs:
+			raise RuntimeError("The config backend must be chosen before any config is loaded.")
+
+		self.backend = backend
+
+	def path(self, guild_id):
+		return f'{self.directory}/{guild_id}.ini'
+
+	def store(self, guild_id):
+		if self.generation is None:
+			self.process_lock = ProcessLock(f'{self.directory}/.lock')
+			self.generation = Generation(f'{self.directory}/.generation')
+
+		if self.backend == 'sqlite':
+			if self.database is None:
+				self.database = SettingsDatabase(f'{self.directory}/settings.db', self.generation)
+			return SqliteStore(self.database, guild_id)
+
+		return IniStore(self.path(guild_id), self.process_lock, self.generation)
+
+	def __getitem__(self, guild_id):
+		guild_id = int(guild_id)
+		config = self.configs.get(guild_id)
+
+		if config is None:
+			with self.lock:
+				config = self.configs.get(guild_id)
+				if config is None:
+					config = Config(self.store(guild_id), guild_id)
+					self.configs[guild_id] = config
+
+		return config
+
+	def warm(self, guild_ids):
+		# load every guild that is not loaded yet in one pass, safe to repeat
+		cold = [config for config in map(self.__getitem__, guild_ids) if not config.loaded]
+		if not cold:
+			return 0
+
+		if self.backend == 'sqlite':
+			stamp = self.database.version()
+			data = self.database.read_all()
+			for config in cold:
+				config.prime(data.get(config.store.guild_id, {}), stamp)
+		else:
+			for config in cold:
+				config.refresh()
+
+		return len(cold)
+
+	async def aload(self, guild_id):
+		config = self[guild_id]
+		await config.arefresh()
+		return config
+
+	async def awarm(self, guild_ids):
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(executor, self.warm, list(guild_ids))
+
+	def __contains__(self, guild_id):
+		return int(guild_id) in self.configs
+
+	def __iter__(self):
+		return iter(list(self.configs))
+
+	def __len__(self):
+		return len(self.configs)
+
+	def values(self):
+		return list(self.configs.values())
+
+# one live config per guild, shared by the bot, cogs and checks
+configs = ConfigRegistry('./config')
+
+@atexit.register
+def flush_all():
+	for config in list(pending):
+		config.flush()
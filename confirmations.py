@@ -0,0 +1,82 @@
+import asyncio
+
+from contextlib import contextmanager
+from discord.http import Route
+from logger import console_log
+
+# pending confirmations, keyed by what answers them so an event finds its
+# waiters with one dict lookup instead of every wait_for check running on it:
+#   reaction    - message id, answered by a reaction on that message
+#   interaction - message id, answered by a button on that message
+#   message     - (channel id, user id), answered by the user's next message there
+# the client only listens for an event while something is waiting on it.
+
+events = {
+    'reaction': 'on_raw_reaction_add',
+    'interaction': 'on_socket_response',
+    'message': 'on_message'
+}
+
+class Confirmations:
+    def __init__(self, client):
+        self.client = client
+        # event -> {key: [(future, uid, answers)]}
+        self.pending = {event: {} for event in events}
+
+    @contextmanager
+    def expect(self, event, key, uid, answers=None):
+        # a future for the answer of uid, one of answers when given. made before
+        # the prompt is sent so a quick answer is not missed, await it with a timeout
+        future = asyncio.get_event_loop().create_future()
+        entry = (future, uid, answers)
+
+        waiting = self.pending[event]
+        if not waiting:
+            self.client.add_listener(getattr(self, events[event]), events[event])
+        waiting.setdefault(key, []).append(entry)
+
+        try:
+            yield future
+        finally:
+            entries = waiting.get(key, [])
+            if entry in entries:
+                entries.remove(entry)
+            if not entries:
+                waiting.pop(key, None)
+            if not waiting:
+                self.client.remove_listener(getattr(self, events[event]), events[event])
+
+    def resolve(self, event, key, uid, answer):
+        # True when the answer was expected by someone
+        resolved = False
+        for future, waiting, answers in self.pending[event].get(key, ()):
+            if waiting == uid and (answers is None or answer in answers) and not future.done():
+                future.set_result(answer)
+                resolved = True
+        return resolved
+
+    async def on_raw_reaction_add(self, payload):
+        self.resolve('reaction', payload.message_id, payload.user_id, str(payload.emoji))
+
+    async def on_message(self, message):
+        self.resolve('message', (message.channel.id, message.author.id), message.author.id, message)
+
+    async def on_socket_response(self, payload):
+        # discord.py 1.7 has no components, buttons are read from the raw gateway event
+        if payload.get('t') != 'INTERACTION_CREATE':
+            return
+
+        data = payload['d']
+        user = data.get('user') or data.get('member', {}).get('user')
+        if not data.get('message') or not user:
+            return
+
+        if self.resolve('interaction', int(data['message']['id']), int(user['id']), data.get('data', {}).get('custom_id')):
+            # acknowledge the click so the button does not show as failed
+            try:
+                await self.client.http.request(
+                    Route('POST', '/interactions/{interaction_id}/{token}/callback', interaction_id=data['id'], token=data['token']),
+                    json={'type': 6}
+                )
+            except Exception as error:
+                console_log(f"Could not acknowledge interaction {data['id']}: {error}")
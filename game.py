@@ -1,8 +1,23 @@
 import sqlite3
 import math
 import random
+import asyncio
 import os
-
+import time
+import atexit
+import weakref
+import threading
+import csv
+import json
+import levels
+
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice, accumulate
+from array import array
+from collections import OrderedDict
+from functools import partial
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
 from discord.ext import commands
 from logger import console_log
 
@@ -13,13 +28,21 @@ from logger import console_log
 # game.donate(author_id, target_id, amount, multiplier)
 # game.charity(uid, amount, multiplier)
 # game.gamble(uid, amount, multiplier)
+# game.buy_perk(uid, perk, amount, price)
 # game.buy_work(uid, amount)
 # game.buy_rob(uid, amount)
+# game.use_charge(uid, perk, amount)
 # game.use_work_charge(uid, amount)
 # game.use_rob_charge(uid, amount)
 # game.withdraw(uid, amount)
 # game.deposit(uid, amount)
 # game.transfer(author_id, target_id, amount)
+# game.leaderboard(board, page, uid)
+# game.bulk_add_cash(uids, amount)
+# game.bulk_reset(uids)
+# game.import_accounts(file, format)
+# game.history(uid, limit)
+# game.verify_ledger(repair)
 
 # define exceptions
 class GameExceptions:
@@ -43,300 +66,1336 @@ class GameExceptions:
         """Insufficient bank balance"""
         pass
 
-class Game:
-    def __init__(self, db):
-        # init dir
-        if not os.path.exists('saves'):
-            os.mkdir('saves')
+    class InvalidLeaderboard(commands.CommandError):
+        """Leaderboard does not exist"""
+        pass
 
-        # init db
-        path_to_db = f'./saves/{db}.db'
+    class InvalidImport(commands.CommandError):
+        """Account import could not be read"""
+        pass
 
-        self.conn = sqlite3.connect(path_to_db)
-        self.c = self.conn.cursor()
+# ==== schema migrations =====
+# applied in order on startup, PRAGMA user_version holds the number of the last one applied
+
+def table_exists(c, table):
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name", {"name": table})
+    return c.fetchone() is not None
+
+def add_primary_keys(c, guild_id):
+    # v1: uid becomes the primary key, duplicate rows keep the most recently written one
+    tables = {
+        "users": ("level INTEGER NOT NULL DEFAULT 1, exp INTEGER NOT NULL DEFAULT 0, cash INTEGER NOT NULL DEFAULT 0", {"level": 1, "exp": 0, "cash": 0}),
+        "perks": ("rob INTEGER NOT NULL DEFAULT 0, work INTEGER NOT NULL DEFAULT 0", {"rob": 0, "work": 0}),
+        "banks": ("balance INTEGER NOT NULL DEFAULT 0", {"balance": 0})
+    }
+
+    for table, (columns, defaults) in tables.items():
+        legacy = table_exists(c, table)
+        if legacy:
+            c.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+
+        c.execute(f"CREATE TABLE {table} (uid INTEGER PRIMARY KEY, {columns})")
+
+        if legacy:
+            names = ", ".join(defaults)
+            values = ", ".join(f"COALESCE({name}, {default})" for name, default in defaults.items())
+            c.execute(f"""INSERT INTO {table} (uid, {names})
+                SELECT uid, {values} FROM {table}_legacy
+                WHERE uid IS NOT NULL AND rowid IN (SELECT MAX(rowid) FROM {table}_legacy GROUP BY uid)""")
+            c.execute(f"DROP TABLE {table}_legacy")
+
+def add_guild_scope(c, guild_id):
+    # v2: rows are keyed by (guild_id, uid) so any number of guilds can share one database
+    tables = {
+        "users": "level INTEGER NOT NULL DEFAULT 1, exp INTEGER NOT NULL DEFAULT 0, cash INTEGER NOT NULL DEFAULT 0",
+        "perks": "rob INTEGER NOT NULL DEFAULT 0, work INTEGER NOT NULL DEFAULT 0",
+        "banks": "balance INTEGER NOT NULL DEFAULT 0"
+    }
+
+    for table, columns in tables.items():
+        c.execute(f"ALTER TABLE {table} RENAME TO {table}_v1")
+        c.execute(f"CREATE TABLE {table} (guild_id INTEGER NOT NULL, uid INTEGER NOT NULL, {columns}, PRIMARY KEY (guild_id, uid)) WITHOUT ROWID")
+
+        c.execute(f"SELECT COUNT(*) FROM {table}_v1")
+        if c.fetchone()[0]:
+            # only a per guild file knows which guild its rows belong to
+            if guild_id is None:
+                raise RuntimeError(f"Cannot scope existing {table} rows without a guild id.")
+            c.execute(f"INSERT INTO {table} SELECT :guild, * FROM {table}_v1", {"guild": guild_id})
+
+        c.execute(f"DROP TABLE {table}_v1")
+
+def add_ranking_indexes(c, guild_id):
+    # v3: covering indexes for building leaderboards
+    c.execute("CREATE INDEX IF NOT EXISTS users_cash ON users (guild_id, cash)")
+    c.execute("CREATE INDEX IF NOT EXISTS users_level ON users (guild_id, level, exp)")
+    c.execute("CREATE INDEX IF NOT EXISTS banks_balance ON banks (guild_id, balance)")
+
+def merge_accounts(c, guild_id):
+    # v4: users, perks and banks become one accounts row, read and written once per command.
+    # perk and bank rows of unregistered users only carry over when they hold something
+    c.execute("""CREATE TABLE accounts (
+        guild_id INTEGER NOT NULL,
+        uid INTEGER NOT NULL,
+        level INTEGER NOT NULL DEFAULT 1,
+        exp INTEGER NOT NULL DEFAULT 0,
+        cash INTEGER NOT NULL DEFAULT 0,
+        work INTEGER NOT NULL DEFAULT 0,
+        rob INTEGER NOT NULL DEFAULT 0,
+        balance INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, uid)
+    ) WITHOUT ROWID""")
+
+    c.execute("INSERT INTO accounts (guild_id, uid, level, exp, cash) SELECT guild_id, uid, level, exp, cash FROM users")
+    c.execute("""INSERT INTO accounts (guild_id, uid, work, rob) SELECT guild_id, uid, work, rob FROM perks WHERE work != 0 OR rob != 0
+        ON CONFLICT (guild_id, uid) DO UPDATE SET work=excluded.work, rob=excluded.rob""")
+    c.execute("""INSERT INTO accounts (guild_id, uid, balance) SELECT guild_id, uid, balance FROM banks WHERE balance != 0
+        ON CONFLICT (guild_id, uid) DO UPDATE SET balance=excluded.balance""")
+
+    for table in ('users', 'perks', 'banks'):
+        c.execute(f"DROP TABLE {table}")
+
+    c.execute("CREATE INDEX accounts_cash ON accounts (guild_id, cash)")
+    c.execute("CREATE INDEX accounts_level ON accounts (guild_id, level, exp)")
+    c.execute("CREATE INDEX accounts_balance ON accounts (guild_id, balance)")
+
+def add_ledger(c, guild_id):
+    # v5: append-only record of every cash and bank change. balances from before
+    # the ledger are entered as opening entries so the ledger sums to them
+    c.execute("""CREATE TABLE ledger (
+        id INTEGER PRIMARY KEY,
+        guild_id INTEGER NOT NULL,
+        uid INTEGER NOT NULL,
+        counterparty INTEGER,
+        account TEXT NOT NULL,
+        delta INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        ts INTEGER NOT NULL
+    )""")
+    c.execute("CREATE INDEX ledger_uid ON ledger (guild_id, uid)")
+
+    ts = int(time.time() * 1000)
+    c.execute("INSERT INTO ledger (guild_id, uid, account, delta, kind, ts) SELECT guild_id, uid, 'cash', cash, 'opening', ? FROM accounts WHERE cash != 0", (ts,))
+    c.execute("INSERT INTO ledger (guild_id, uid, account, delta, kind, ts) SELECT guild_id, uid, 'bank', balance, 'opening', ? FROM accounts WHERE balance != 0", (ts,))
+
+migrations = [
+    add_primary_keys,
+    add_guild_scope,
+    add_ranking_indexes,
+    merge_accounts,
+    add_ledger
+]
+
+# (uid, counterparty, account, delta, kind, ts) rows as buffered by Accounts
+ledger_insert = "INSERT INTO ledger (guild_id, uid, counterparty, account, delta, kind, ts) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+def migrate(conn, guild_id=None):
+    c = conn.cursor()
+    c.execute("PRAGMA user_version")
+    version = c.fetchone()[0]
+
+    for number, migration in enumerate(migrations[version:], start=version + 1):
+        with conn:
+            c.execute("BEGIN")
+            migration(c, guild_id)
+            c.execute(f"PRAGMA user_version = {number}")
+
+        console_log(f"Applied economy schema migration {number} ({migration.__name__}).")
+
+# marks a uid that is not cached at all
+missing = object()
+
+class Connection:
+    # one sqlite connection, opened on first use and used by one thread at a time
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.lock = threading.Lock()
+        self.evicted = False
+
+    def open(self, guild_id, wal):
+        # used from whichever database thread holds the lock
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        if wal:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        migrate(self.conn, guild_id)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class Storage:
+    # where guild economies live:
+    #   guild   - one ./saves/<guild_id>.db per guild (default)
+    #   sharded - guilds hashed over ./saves/economy-<n>.db WAL databases
+    # connections are opened on demand and the least recently used are closed past capacity
+    modes = ['guild', 'sharded']
+
+    def __init__(self, directory='./saves', mode='guild', shards=1, capacity=64):
+        if mode not in self.modes:
+            raise ValueError(f"Unknown economy storage '{mode}', expected one of {', '.join(self.modes)}.")
+        if int(shards) < 1:
+            raise ValueError("Economy storage needs at least one shard.")
+
+        self.directory = directory
+        self.mode = mode
+        self.shards = int(shards)
+        self.capacity = int(capacity)
+
+        self.connections = OrderedDict()
+        self.lock = threading.Lock()
+
+    def path(self, guild_id):
+        if self.mode == 'sharded':
+            return f'{self.directory}/economy-{int(guild_id) % self.shards}.db'
+        return f'{self.directory}/{guild_id}.db'
+
+    def checkout(self, path):
+        with self.lock:
+            connection = self.connections.get(path)
+            if connection is None:
+                connection = self.connections[path] = Connection(path)
+            self.connections.move_to_end(path)
+
+            # evict idle connections only, a busy one goes on the next pass
+            over = len(self.connections) - self.capacity
+            for key, idle in list(self.connections.items())[:-1]:
+                if over <= 0:
+                    break
+                if idle.lock.acquire(blocking=False):
+                    idle.evicted = True
+                    idle.close()
+                    idle.lock.release()
+                    del self.connections[key]
+                    over = over - 1
+
+        return connection
+
+    @contextmanager
+    def connect(self, guild_id):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+
+        path = self.path(guild_id)
+        while True:
+            connection = self.checkout(path)
+            with connection.lock:
+                # evicted while we waited for it, take the fresh one
+                if connection.evicted:
+                    continue
+
+                if connection.conn is None:
+                    scope = guild_id if self.mode == 'guild' else None
+                    connection.open(scope, self.mode == 'sharded')
+
+                yield connection.conn
+                return
+
+    def close(self):
+        with self.lock:
+            for connection in self.connections.values():
+                with connection.lock:
+                    connection.evicted = True
+                    connection.close()
+            self.connections.clear()
+
+storage = Storage(
+    mode = os.getenv('ECONOMY_STORAGE', 'guild'),
+    shards = os.getenv('ECONOMY_SHARDS', 1)
+)
+
+class AccountCache:
+    # write-behind copy of one guild's accounts. rows are read once, changed in
+    # memory and written back together by flush(), the least recently used
+    # clean rows are dropped past capacity.
+    def __init__(self, guild_id, storage, capacity=4096):
+        self.guild_id = guild_id
+        self.storage = storage
+        self.capacity = capacity
+
+        # rows are stored side by side in one array of 64 bit ints instead of an
+        # object each. uid -> slot in least recently used order, None for
+        # accounts known not to exist
+        self.slots = {}
+        self.values = array('q')
+        self.free = []
+
+        self.dirty = set()
+        # ledger entries of committed commands, written with the rows
+        self.ledger = []
+        self.lock = threading.RLock()
+
+    def get(self, uid):
+        # the cached row without touching the database, missing when not cached
+        slot = self.slots.get(uid, missing)
+        if slot is None or slot is missing:
+            return slot
+
+        width = len(Account.columns)
+        return tuple(self.values[slot * width:(slot + 1) * width])
+
+    def put(self, uid, row):
+        # store a row, or None for no account, as the most recently used
+        width = len(Account.columns)
+        slot = self.slots.pop(uid, None)
+
+        if row is None:
+            if slot is not None:
+                self.free.append(slot)
+        elif slot is not None:
+            self.values[slot * width:(slot + 1) * width] = array('q', row)
+        elif self.free:
+            slot = self.free.pop()
+            self.values[slot * width:(slot + 1) * width] = array('q', row)
+        else:
+            slot = len(self.values) // width
+            self.values.extend(row)
+
+        self.slots[uid] = slot if row is not None else None
+
+    def row(self, uid):
+        row = self.get(uid)
+        if row is missing:
+            with self.storage.connect(self.guild_id) as conn:
+                row = conn.execute(f"SELECT {', '.join(Account.columns)} FROM accounts WHERE guild_id=? AND uid=?", (self.guild_id, uid)).fetchone()
+
+        self.put(uid, row)
+        return row
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            accounts = CachedAccounts(self)
+            # rows looked up by a failed command are cached as well, evicted either way
+            try:
+                try:
+                    yield accounts
+                except BaseException:
+                    for uid, row in accounts.undo.items():
+                        self.put(uid, row)
+                    raise
+
+                self.dirty.update(accounts.undo)
+                self.ledger.extend(accounts.entries)
+
+                if len(self.dirty) >= self.capacity or len(self.ledger) >= self.capacity:
+                    try:
+                        self.flush()
+                    except sqlite3.Error as error:
+                        console_log(f"Could not write economy cache for guild {self.guild_id}: {error}")
+            finally:
+                self.evict()
+
+    def clear(self):
+        # drop every row, pending changes must be flushed first
+        self.slots = {}
+        self.values = array('q')
+        self.free = []
+
+    def evict(self):
+        over = len(self.slots) - self.capacity
+        if over > 0:
+            for uid in list(islice((uid for uid in self.slots if uid not in self.dirty), over)):
+                slot = self.slots.pop(uid)
+                if slot is not None:
+                    self.free.append(slot)
+
+    def flush(self):
+        # one transaction for every dirty row, returns the number written
+        with self.lock:
+            if not self.dirty and not self.ledger:
+                return 0
+
+            columns = Account.columns
+            with self.storage.connect(self.guild_id) as conn:
+                with conn:
+                    conn.executemany(f"""INSERT INTO accounts (guild_id, uid, {', '.join(columns)}) VALUES (?, ?, {', '.join('?' * len(columns))})
+                        ON CONFLICT (guild_id, uid) DO UPDATE SET {', '.join(f'{column}=excluded.{column}' for column in columns)}""",
+                        [(self.guild_id, uid, *self.get(uid)) for uid in self.dirty])
+                    conn.executemany(ledger_insert, [(self.guild_id, *entry) for entry in self.ledger])
+
+            count = len(self.dirty)
+            self.dirty.clear()
+            self.ledger.clear()
+            return count
+
+class CacheFlusher:
+    # background thread writing every AccountCache back each interval
+    def __init__(self, interval):
+        self.interval = interval
+        self.caches = weakref.WeakSet()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def add(self, cache):
+        with self.lock:
+            self.caches.add(cache)
+
+            if not self.thread:
+                self.thread = threading.Thread(target=self.run, name='economy-flusher', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        for cache in list(self.caches):
+            try:
+                cache.flush()
+            except Exception as error:
+                # rows stay dirty and are retried on the next pass, the thread keeps running
+                console_log(f"Could not write economy cache for guild {cache.guild_id}: {type(error)}: {error}")
+
+# commit   - every command commits before it returns (default)
+# interval - commands change cached rows which are written back every
+#            ECONOMY_FLUSH_MS and on exit, a crash loses at most that window
+durabilities = ['commit', 'interval']
+durability = os.getenv('ECONOMY_DURABILITY', 'commit')
+flusher = CacheFlusher(int(os.getenv('ECONOMY_FLUSH_MS', 1000)) / 1000)
+
+@atexit.register
+def flush_all():
+    flusher.flush()
+
+# leaderboards over accounts: the score as sql, and the same score from an Account
+boards = {
+    'cash': ("cash", lambda account: account.cash),
+    'bank': ("balance", lambda account: account.balance),
+    # level first, exp breaks ties
+    'level': ("(level << 32) + exp", lambda account: (account.level << 32) + account.exp),
+    'networth': ("cash + balance", lambda account: account.cash + account.balance)
+}
+
+class Ranking:
+    # one leaderboard, highest score first. each key packs (-score, uid) into one
+    # int so 500k entries stay small. keys are kept in sorted buckets of at most
+    # 2 * load so an update only shifts one bucket, rank lookups bisect the bucket
+    # maxes and then a bucket.
+    load = 1000
+
+    def __init__(self, scores):
+        self.scores = dict(scores)
+        keys = sorted(self.key(uid, score) for uid, score in self.scores.items())
+        self.buckets = [keys[index:index + self.load] for index in range(0, len(keys), self.load)]
+        self.maxes = [bucket[-1] for bucket in self.buckets]
+        # number of keys before each bucket, rebuilt on the first lookup after a change
+        self.offsets = None
+
+    @staticmethod
+    def key(uid, score):
+        return (-score << 64) | uid
+
+    def bucket(self, key):
+        return min(bisect_left(self.maxes, key), len(self.maxes) - 1)
+
+    def insert(self, key):
+        if not self.buckets:
+            self.buckets.append([key])
+            self.maxes.append(key)
+            return
+
+        index = self.bucket(key)
+        bucket = self.buckets[index]
+        insort(bucket, key)
+        self.maxes[index] = bucket[-1]
+
+        if len(bucket) > 2 * self.load:
+            self.buckets[index:index + 1] = [bucket[:self.load], bucket[self.load:]]
+            self.maxes[index:index + 1] = [bucket[self.load - 1], bucket[-1]]
+
+    def remove(self, key):
+        index = self.bucket(key)
+        bucket = self.buckets[index]
+        del bucket[bisect_left(bucket, key)]
+
+        if bucket:
+            self.maxes[index] = bucket[-1]
+        else:
+            del self.buckets[index]
+            del self.maxes[index]
+
+    def update(self, uid, score):
+        old = self.scores.get(uid)
+        if old == score:
+            return
+
+        if old is not None:
+            self.remove(self.key(uid, old))
+        self.insert(self.key(uid, score))
+
+        self.scores[uid] = score
+        self.offsets = None
+
+    def index(self):
+        if self.offsets is None:
+            self.offsets = [0, *accumulate(len(bucket) for bucket in self.buckets)]
+        return self.offsets
+
+    def rank(self, uid):
+        score = self.scores.get(uid)
+        if score is not None:
+            key = self.key(uid, score)
+            index = self.bucket(key)
+            return self.index()[index] + bisect_left(self.buckets[index], key) + 1
+
+    def page(self, start, count):
+        # [(uid, score)] from the start-th highest score
+        offsets = self.index()
+        index = bisect_right(offsets, start) - 1
+        keys = []
+
+        if index < len(self.buckets):
+            keys = self.buckets[index][start - offsets[index]:]
+            for bucket in self.buckets[index + 1:]:
+                if len(keys) >= count:
+                    break
+                keys = keys + bucket
+
+        return [(key & 0xFFFFFFFFFFFFFFFF, -(key >> 64)) for key in keys[:count]]
+
+    def __len__(self):
+        return len(self.scores)
+
+class HeldLocks:
+    # several stripes taken in order, released in reverse
+    __slots__ = ('locks',)
+
+    def __init__(self, locks):
+        self.locks = locks
+
+    def __enter__(self):
+        for lock in self.locks:
+            lock.acquire()
+
+    def __exit__(self, *exc):
+        for lock in reversed(self.locks):
+            lock.release()
+
+class AccountLocks:
+    # a fixed set of locks shared by every guild, an account always maps to the
+    # same one. there is nothing to create or evict per account, two accounts
+    # sharing a stripe only means they wait for each other. commands over several
+    # accounts take their stripes in order, so rob(a, b) and rob(b, a) at the
+    # same time cannot deadlock
+    def __init__(self, stripes=4096):
+        self.stripes = [threading.Lock() for index in range(stripes)]
+
+    def __len__(self):
+        return len(self.stripes)
+
+    def hold(self, guild_id, *uids):
+        # a context manager holding the stripes of every uid
+        if len(uids) == 1:
+            return self.stripes[hash((guild_id, uids[0])) % len(self.stripes)]
+
+        indexes = {hash((guild_id, uid)) % len(self.stripes) for uid in uids}
+        if len(indexes) == 1:
+            return self.stripes[indexes.pop()]
+        if not indexes:
+            return nullcontext()
+        return HeldLocks([self.stripes[index] for index in sorted(indexes)])
+
+# held by commands for the accounts they change, always before the database
+account_locks = AccountLocks()
+
+# odds and payout ranges of the commands, simulate.py plays the same numbers.
+# rolls are randint(0, 100): a rob succeeds at or below rob_odds (minus the
+# perk bonus from the roll), a gamble wins above gamble_odds
+work_pay = (1, 3)
+rob_share = 0.20
+rob_odds = 49
+rob_perk_odds = 15
+gamble_pay = (0.1, 2.0)
+gamble_odds = 49
+# exp for spending cash grows with its log in this base
+exp_base = 1.1
 
-        # init tables
-        with self.conn:
-            self.c.execute("CREATE TABLE IF NOT EXISTS users (uid INTEGER, level INTEGER, exp INTEGER, cash INTEGER)")
-            self.c.execute("CREATE TABLE IF NOT EXISTS perks (uid INTEGER, rob INTEGER, work INTEGER)")
-            self.c.execute("CREATE TABLE IF NOT EXISTS banks (uid INTEGER, balance INTEGER)")
+class Game:
+    def __init__(self, guild_id, storage=storage, durability=durability, curve=levels.default):
+        if durability not in durabilities:
+            raise ValueError(f"Unknown economy durability '{durability}', expected one of {', '.join(durabilities)}.")
+
+        # the database is opened by the first transaction
+        self.guild_id = guild_id
+        self.storage = storage
+        # level curve of the guild, swapped when its config changes
+        self.curve = curve
+
+        # board -> Ranking, built by the first leaderboard request and kept up to date after
+        self.rankings = {}
+        # striped account locks, shared with every other guild
+        self.locks = account_locks
+
+        # keep a single Game per guild when caching, each has its own copy of the rows
+        self.cache = None
+        if durability == 'interval':
+            self.cache = AccountCache(guild_id, storage)
+            flusher.add(self.cache)
+
+    @contextmanager
+    def transaction(self, *uids):
+        # uids are the accounts the transaction changes, locked until it is done.
+        # without uids nothing is changed and it only reads
+        with self.locks.hold(self.guild_id, *uids):
+            if self.cache:
+                with self.cache.transaction() as accounts:
+                    yield accounts
+                    self.rerank(accounts.saved)
+                return
+
+            with self.storage.connect(self.guild_id) as conn:
+                c = conn.cursor()
+
+                # BEGIN IMMEDIATE takes the write lock up front, so the reads made
+                # inside cannot go stale before the writes that depend on them.
+                # reads alone take a deferred transaction and leave writers alone
+                c.execute("BEGIN IMMEDIATE" if uids else "BEGIN")
+                accounts = Accounts(c, self.guild_id)
+                try:
+                    yield accounts
+                    accounts.write_ledger()
+                    conn.commit()
+                except BaseException:
+                    # a failed ledger write or commit must not leave the shared connection in the transaction
+                    conn.rollback()
+                    raise
+
+                self.rerank(accounts.saved)
+
+    @contextmanager
+    def database(self):
+        # the connection with every cached change written, the cache stays locked meanwhile
+        with self.cache.lock if self.cache else nullcontext():
+            if self.cache:
+                self.cache.flush()
+
+            with self.storage.connect(self.guild_id) as conn:
+                yield conn
+
+    @contextmanager
+    def bulk(self):
+        # one transaction of statements over many accounts, straight on the database.
+        # cached rows are dropped after, leaderboards are rebuilt on demand
+        with self.database() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                yield c
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+            if self.cache:
+                self.cache.clear()
+            self.rankings.clear()
+
+    def rerank(self, saved):
+        # move the accounts written by a transaction on every live leaderboard
+        for uid, account in saved.items():
+            for board, ranking in self.rankings.items():
+                ranking.update(uid, boards[board][1](account))
 
     def register(self, uid):
-        user = User(uid)
-        user = user.register(self.conn, self.c)
-        return user
+        with self.transaction(uid) as accounts:
+            return accounts.register(uid)
 
-    def work(self, uid, multiplier=1):
-        user = User.get(self.conn, self.c, uid)
-        user.perks = Perk.get(self.conn, self.c, uid)
+    def user(self, uid):
+        with self.transaction() as accounts:
+            return accounts.account(uid)
+
+    def perks(self, uid):
+        with self.transaction() as accounts:
+            account = accounts.account(uid)
+        return account.perks if account else Perk(uid)
 
+    def bank(self, uid):
+        with self.transaction() as accounts:
+            account = accounts.account(uid)
+        return account.bank if account else Bank(uid)
+
+    def work(self, uid, multiplier=1):
         # ensure argument type
         multiplier = float(multiplier)
 
-        # validation
-        if not user:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
+        with self.transaction(uid) as accounts:
+            user = accounts.account(uid)
 
-        has_perk = self.use_work_charge(uid)
+            # validation
+            if not user:
+                raise GameExceptions.UserNotFound("You must be registered to do this.")
 
-        if has_perk:
-            multiplier = multiplier + 1
+            has_perk = user.work > 0
 
-        amount = round(random.randint(user.level, user.level * 3) * multiplier)
-        
-        cash = user.add_cash(self.conn, self.c, amount)
-        exp, levelup = user.add_exp(self.conn, self.c, multiplier)
+            if has_perk:
+                user.work = user.work - 1
+                multiplier = multiplier + 1
 
-        return {"amount": amount, "cash": cash, "exp": exp, "levelup": levelup, "perk": has_perk}
+            amount = round(random.randint(user.level * work_pay[0], user.level * work_pay[1]) * multiplier)
+            exp, levelup = user.gain_exp(multiplier, curve=self.curve)
+            user.cash = user.cash + amount
 
-    def rob(self, author_id, target_id, multiplier=0.9):
-        user = User.get(self.conn, self.c, author_id)
-        target = User.get(self.conn, self.c, target_id)
+            accounts.save(user)
+            accounts.record(uid, amount, 'work')
+
+        return {"amount": amount, "cash": user.cash, "exp": exp, "levelup": levelup, "level": user.level, "perk": has_perk}
 
+    def rob(self, author_id, target_id, multiplier=0.9):
         # ensure argument type
         multiplier = float(multiplier)
 
-        #define limits
-        upper_limit = round(target.cash * 0.20)
-        lower_limit = 1
-
-        # validation
-        if not user:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
-        if not target:
-            raise GameExceptions.UserNotFound("User is not registered.")
-        if target.cash <= 0:
-            raise GameExceptions.InvalidRobTarget("This person has nothing you can take")
-        if upper_limit >= lower_limit:
-            raise GameExceptions.InvalidAmount("Could not rob this user.")
-
-        has_perk = self.use_rob_charge(author_id)
-
-        amount = round(random.randint(0, upper_limit) * multiplier)
-        x = random.randint(0, 100)
-
-        if has_perk:
-            x = x - 15
-
-        if x > 49:
-            user.take_cash(self.conn, self.c, amount)
-            failed = True
-            exp = 0
-            levelup = False
-        else:
-            user.add_cash(self.conn, self.c, amount)
-            exp, levelup = user.add_exp(self.conn, self.c, multiplier)
-    
-            target.take_cash(self.conn, self.c, amount)
-            failed = False
+        with self.transaction(author_id, target_id) as accounts:
+            user, target = accounts.accounts(author_id, target_id)
 
-        user = user.get(self.conn, self.c, author_id)
-        cash = user.cash
+            # validation
+            if not user:
+                raise GameExceptions.UserNotFound("You must be registered to do this.")
+            if not target:
+                raise GameExceptions.UserNotFound("User is not registered.")
+            if target.cash <= 0:
+                raise GameExceptions.InvalidRobTarget("This person has nothing you can take")
+
+            #define limits
+            upper_limit = round(target.cash * rob_share)
+            lower_limit = 1
+
+            if upper_limit < lower_limit:
+                raise GameExceptions.InvalidAmount("Could not rob this user.")
+
+            has_perk = user.rob > 0
+
+            if has_perk:
+                user.rob = user.rob - 1
+
+            amount = round(random.randint(0, upper_limit) * multiplier)
+            x = random.randint(0, 100)
+
+            if has_perk:
+                x = x - rob_perk_odds
+
+            if x > rob_odds:
+                user.cash = user.cash - amount
+                failed = True
+                exp = 0
+                levelup = False
+                accounts.record(author_id, -amount, 'fine')
+            else:
+                exp, levelup = user.gain_exp(multiplier, curve=self.curve)
+                user.cash = user.cash + amount
+                target.cash = target.cash - amount
+                failed = False
+                accounts.record(author_id, amount, 'rob', target_id)
+                accounts.record(target_id, -amount, 'rob', author_id)
+
+            accounts.save(user, target)
 
         console_log(f"Command 'rob' called. Return value: {x}")
 
-        return {"failed": failed, "amount": amount, "cash": cash, "exp": exp, "levelup": levelup, "perk": has_perk}
+        return {"failed": failed, "amount": amount, "cash": user.cash, "exp": exp, "levelup": levelup, "level": user.level, "perk": has_perk}
 
     def donate(self, author_id, target_id, amount, multiplier=1):
-        user = User.get(self.conn, self.c, author_id)
-        target = User.get(self.conn, self.c, target_id)
-
         # ensure argument type
         amount = int(amount)
         multiplier = float(multiplier)
 
-        # validation
-        if not user:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
-        if not target:
-            raise GameExceptions.UserNotFound("User is not registered.")
-        if amount > user.cash or amount <= 0:
-            raise GameExceptions.InvalidAmount("Amount specified exceeds available cash or is zero.")
+        with self.transaction(author_id, target_id) as accounts:
+            user, target = accounts.accounts(author_id, target_id)
 
-        cash = user.take_cash(self.conn, self.c, amount)
-        exp, levelup = user.add_exp(self.conn, self.c, multiplier, amount)
+            # validation
+            if not user:
+                raise GameExceptions.UserNotFound("You must be registered to do this.")
+            if not target:
+                raise GameExceptions.UserNotFound("User is not registered.")
+            if amount > user.cash or amount <= 0:
+                raise GameExceptions.InvalidAmount("Amount specified exceeds available cash or is zero.")
 
-        cash = target.add_cash(self.conn, self.c, amount)
-        
-        return {"amount": amount, "cash": cash, "exp": exp, "levelup": levelup}
+            exp, levelup = user.gain_exp(multiplier, amount, self.curve)
+            user.cash = user.cash - amount
+            target.cash = target.cash + amount
 
-    def charity(self, uid, amount, multiplier=0.9):
-        user = User.get(self.conn, self.c, uid)
+            accounts.save(user, target)
+            accounts.record(author_id, -amount, 'donate', target_id)
+            accounts.record(target_id, amount, 'donate', author_id)
 
+        return {"amount": amount, "cash": user.cash, "exp": exp, "levelup": levelup, "level": user.level}
+
+    def charity(self, uid, amount, multiplier=0.9):
         # ensure argument type
         amount = int(amount)
         multiplier = float(multiplier)
 
-        # validation
-        if not user:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
-        if amount > user.cash or amount < 0:
-            raise GameExceptions.InvalidAmount("Amount specified exceeds available cash or is zero.")
+        with self.transaction(uid) as accounts:
+            user = accounts.account(uid)
 
-        cash = user.take_cash(self.conn, self.c, amount)
-        exp, levelup = user.add_exp(self.conn, self.c, multiplier, amount)
+            # validation
+            if not user:
+                raise GameExceptions.UserNotFound("You must be registered to do this.")
+            if amount > user.cash or amount < 0:
+                raise GameExceptions.InvalidAmount("Amount specified exceeds available cash or is zero.")
 
-        return {"cash": cash, "exp": exp, "levelup": levelup}
+            exp, levelup = user.gain_exp(multiplier, amount, self.curve)
+            user.cash = user.cash - amount
 
-    def gamble(self, uid, amount, multiplier=1):
-        user = User.get(self.conn, self.c, uid)
+            accounts.save(user)
+            accounts.record(uid, -amount, 'charity')
+
+        return {"cash": user.cash, "exp": exp, "levelup": levelup, "level": user.level}
 
+    def gamble(self, uid, amount, multiplier=1):
         # ensure argument type
         amount = int(amount)
         multiplier = float(multiplier)
 
-        # validation
-        if not user:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
-        if amount > user.cash or amount < 0:
-            raise GameExceptions.InvalidAmount("Amount specified exceeds available cash or is zero.")
+        with self.transaction(uid) as accounts:
+            user = accounts.account(uid)
 
-        # limits
-        lower_limit = round(amount * 0.1)
-        upper_limit = round(amount * 2.0)
+            # validation
+            if not user:
+                raise GameExceptions.UserNotFound("You must be registered to do this.")
+            if amount > user.cash or amount < 0:
+                raise GameExceptions.InvalidAmount("Amount specified exceeds available cash or is zero.")
 
-        value = random.randint(lower_limit, upper_limit)
-        win_value = random.randint(0, 100)
+            # limits
+            lower_limit = round(amount * gamble_pay[0])
+            upper_limit = round(amount * gamble_pay[1])
 
-        if win_value > 49:
-            cash = user.add_cash(self.conn, self.c, value)
-            win = True
-        else:
-            cash = user.take_cash(self.conn, self.c, value)
-            win = False
+            value = random.randint(lower_limit, upper_limit)
+            win_value = random.randint(0, 100)
 
-        return {"amount": value, "cash": cash, "win": win}
+            if win_value > gamble_odds:
+                user.cash = user.cash + value
+                win = True
+            else:
+                user.cash = user.cash - value
+                win = False
 
-    def buy_work(self, uid, amount):
-        # work price:
-        price = 10
+            accounts.save(user)
+            accounts.record(uid, value if win else -value, 'gamble')
 
-        user = User.get(self.conn, self.c, uid)
+        return {"amount": value, "cash": user.cash, "win": win}
 
+    def buy_perk(self, uid, perk, amount, price):
         # esnure data type
         amount = int(amount)
+        cost = amount * price
 
-        # validation
-        if not user:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
+        assert perk in Account.perk_names
 
-        user.perks = Perk.get(self.conn, self.c, uid)
+        if amount <= 0:
+            raise GameExceptions.InvalidAmount("Amount must be greater than zero.")
+
+        with self.transaction(uid) as accounts:
+            user = accounts.account(uid)
+
+            # validation
+            if not user:
+                raise GameExceptions.UserNotFound("You must be registered to do this.")
+            if cost > user.cash:
+                raise GameExceptions.NotEnoughCash("You cannot afford this.")
+
+            user.cash = user.cash - cost
+            setattr(user, perk, getattr(user, perk) + amount)
+
+            accounts.save(user)
+            accounts.record(uid, -cost, f'buy_{perk}')
 
-        cost = amount * price
-        if cost > user.cash:
-            raise GameExceptions.NotEnoughCash("You cannot afford this.")
-        
-        user.take_cash(self.conn, self.c, cost)
-        user.perks.add_work_charge(self.conn, self.c, amount)
         return {"amount": amount, "cost": cost}
 
+    def buy_work(self, uid, amount):
+        # work price:
+        price = 10
+        return self.buy_perk(uid, 'work', amount, price)
+
     def buy_rob(self, uid, amount):
         # rob price:
         price = 50
+        return self.buy_perk(uid, 'rob', amount, price)
 
-        user = User.get(self.conn, self.c, uid)
-
-        # esnure data type
+    def use_charge(self, uid, perk, amount):
         amount = int(amount)
 
-        # validation
-        if not user:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
+        assert perk in Account.perk_names
 
-        user.perks = Perk.get(self.conn, self.c, uid)
+        with self.transaction(uid) as accounts:
+            user = accounts.account(uid)
 
-        cost = amount * price
-        if cost > user.cash:
-            raise GameExceptions.NotEnoughCash("You cannot afford this.")
-        
-        user.take_cash(self.conn, self.c, cost)
-        user.perks.add_rob_charge(self.conn, self.c, amount)
-        return {"amount": amount, "cost": cost}
+            if not user:
+                raise GameExceptions.UserNotFound("You must be registered to do this.")
+            if getattr(user, perk) < amount:
+                return False
+
+            setattr(user, perk, getattr(user, perk) - amount)
+            accounts.save(user)
+
+        return True
 
     def use_work_charge(self, uid, amount=1):
-        user = User.get(self.conn, self.c, uid)
+        return self.use_charge(uid, 'work', amount)
 
+    def use_rob_charge(self, uid, amount=1):
+        return self.use_charge(uid, 'rob', amount)
+
+    def deposit(self, uid, amount):
         amount = int(amount)
 
-        if not user:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
+        if amount <= 0:
+            raise GameExceptions.InvalidAmount("Amount must be greater than zero.")
 
-        user.perk = Perk.get(self.conn, self.c, uid)
+        with self.transaction(uid) as accounts:
+            user = accounts.account(uid)
 
-        if user.perk.work < amount:
-            return False
-        
-        user.perk.take_work_charge(self.conn, self.c, amount)
-        return True
+            if not user:
+                raise GameExceptions.UserNotFound("You must be registered to do this.")
+            if amount > user.cash:
+                raise GameExceptions.NotEnoughCash("You dont have enough cash.")
 
-    def use_rob_charge(self, uid, amount=1):
-        user = User.get(self.conn, self.c, uid)
+            user.cash = user.cash - amount
+            user.balance = user.balance + amount
+
+            accounts.save(user)
+            accounts.record(uid, -amount, 'deposit')
+            accounts.record(uid, amount, 'deposit', account='bank')
+
+        return amount
 
+    def withdraw(self, uid, amount):
         amount = int(amount)
 
-        if not user:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
+        if amount <= 0:
+            raise GameExceptions.InvalidAmount("Amount must be greater than zero.")
 
-        user.perk = Perk.get(self.conn, self.c, uid)
+        with self.transaction(uid) as accounts:
+            user = accounts.account(uid)
 
-        if user.perk.rob < amount:
-            return False
+            if not user:
+                raise GameExceptions.UserNotFound("You must be registered to do this.")
+            if amount > user.balance:
+                raise GameExceptions.InsufficientBankBalance("You do not have enough cash in the bank.")
 
-        user.perk.take_rob_charge(self.conn, self.c, amount)
-        return True
+            user.balance = user.balance - amount
+            user.cash = user.cash + amount
 
-    def deposit(self, uid, amount):
-        user = User.get(self.conn, self.c, uid)
-        user.bank = Bank.get(self.conn, self.c, uid)
+            accounts.save(user)
+            accounts.record(uid, -amount, 'withdraw', account='bank')
+            accounts.record(uid, amount, 'withdraw')
 
+        return amount
+
+    def transfer(self, author_id, target_id, amount):
         amount = int(amount)
 
-        if not user:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
-        if amount > user.cash:
-            raise GameExceptions.NotEnoughCash("You dont have enough cash.")
+        if amount <= 0:
+            raise GameExceptions.InvalidAmount("Amount must be greater than zero.")
 
-        user.take_cash(self.conn, self.c, amount)
-        user.bank.deposit(self.conn, self.c, amount)
+        with self.transaction(author_id, target_id) as accounts:
+            user, target = accounts.accounts(author_id, target_id)
 
-        return amount
+            if not user or not target:
+                raise GameExceptions.UserNotFound("You must be registered to do this.")
+            if amount > user.balance:
+                raise GameExceptions.InsufficientBankBalance("You do not have enough cash in the bank.")
 
-    def withdraw(self, uid, amount):
-        user = User.get(self.conn, self.c, uid)
-        user.bank = Bank.get(self.conn, self.c, uid)
+            user.balance = user.balance - amount
+            target.balance = target.balance + amount
+
+            accounts.save(user, target)
+            accounts.record(author_id, -amount, 'transfer', target_id, 'bank')
+            accounts.record(target_id, amount, 'transfer', author_id, 'bank')
+
+        return amount
 
+    def bulk_add_cash(self, uids, amount):
+        # pay (or fine) many users at once, returns how many were registered
         amount = int(amount)
 
-        if not user:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
-        if amount > user.bank.balance:
-            raise GameExceptions.InsufficientBankBalance("You do not have enough cash in the bank.")
+        uids = list(uids)
+        ts = int(time.time() * 1000)
+
+        with self.bulk() as c:
+            c.executemany("UPDATE accounts SET cash=cash + ? WHERE guild_id=? AND uid=?", ((amount, self.guild_id, uid) for uid in uids))
+            count = c.rowcount
+
+            if amount:
+                c.executemany("""INSERT INTO ledger (guild_id, uid, account, delta, kind, ts)
+                    SELECT guild_id, uid, 'cash', ?, 'payout', ? FROM accounts WHERE guild_id=? AND uid=?""", ((amount, ts, self.guild_id, uid) for uid in uids))
+
+            return count
+
+    def bulk_reset(self, uids=None):
+        # back to a fresh account, for everyone when uids is None
+        defaults = Account(0).data
+        columns = ', '.join(f'{column}={defaults[column]}' for column in Account.columns)
+
+        ts = int(time.time() * 1000)
+
+        with self.bulk() as c:
+            if uids is None:
+                # empty the balances in the ledger before they are cleared
+                for account, column in (('cash', 'cash'), ('bank', 'balance')):
+                    c.execute(f"""INSERT INTO ledger (guild_id, uid, account, delta, kind, ts)
+                        SELECT guild_id, uid, '{account}', -{column}, 'reset', ? FROM accounts WHERE guild_id=? AND {column} != 0""", (ts, self.guild_id))
+                c.execute(f"UPDATE accounts SET {columns} WHERE guild_id=?", (self.guild_id,))
+                return c.rowcount
+
+            uids = list(uids)
+            for account, column in (('cash', 'cash'), ('bank', 'balance')):
+                c.executemany(f"""INSERT INTO ledger (guild_id, uid, account, delta, kind, ts)
+                    SELECT guild_id, uid, '{account}', -{column}, 'reset', ? FROM accounts WHERE guild_id=? AND uid=? AND {column} != 0""", ((ts, self.guild_id, uid) for uid in uids))
+            c.executemany(f"UPDATE accounts SET {columns} WHERE guild_id=? AND uid=?", ((self.guild_id, uid) for uid in uids))
+            return c.rowcount
+
+    def import_accounts(self, file, format='csv'):
+        # create or overwrite accounts from a csv file with a header row, or a
+        # json list of objects. uid is required, other columns keep their defaults.
+        if format == 'csv':
+            records = csv.DictReader(file)
+        elif format == 'json':
+            try:
+                records = json.load(file)
+            except ValueError as error:
+                raise GameExceptions.InvalidImport(f"Could not read the json file: {error}")
+            if not isinstance(records, list):
+                raise GameExceptions.InvalidImport("Expected a json list of accounts.")
+        else:
+            raise GameExceptions.InvalidImport(f"Cannot import **{format}** files, use csv or json.")
+
+        defaults = Account(0).data
+
+        def rows():
+            # streamed into executemany, a bad record aborts the whole import
+            for line, record in enumerate(records, start=1):
+                try:
+                    row = [self.guild_id, int(record['uid'])]
+                    for column in Account.columns:
+                        value = record.get(column)
+                        row.append(defaults[column] if value in (None, '') else int(value))
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    raise GameExceptions.InvalidImport(f"Account {line} needs a numeric uid and numeric values.")
+                yield row
+
+        columns = ', '.join(defaults)
+        ts = int(time.time() * 1000)
+
+        with self.bulk() as c:
+            # staged first so the ledger can record the change against the old balances
+            # a uid listed twice keeps its last row, like the upsert into accounts
+            c.execute(f"CREATE TEMP TABLE imported ({columns}, guild_id, PRIMARY KEY (guild_id, uid))")
+            try:
+                c.executemany(f"INSERT OR REPLACE INTO imported (guild_id, {columns}) VALUES (?, {', '.join('?' * len(defaults))})", rows())
+                count = c.execute("SELECT COUNT(*) FROM imported").fetchone()[0]
+
+                for account, column in (('cash', 'cash'), ('bank', 'balance')):
+                    c.execute(f"""INSERT INTO ledger (guild_id, uid, account, delta, kind, ts)
+                        SELECT imported.guild_id, imported.uid, '{account}', imported.{column} - COALESCE(accounts.{column}, 0), 'import', ? FROM imported
+                        LEFT JOIN accounts ON accounts.guild_id=imported.guild_id AND accounts.uid=imported.uid
+                        WHERE imported.{column} != COALESCE(accounts.{column}, 0)""", (ts,))
+
+                c.execute(f"""INSERT INTO accounts (guild_id, {columns}) SELECT guild_id, {columns} FROM imported WHERE true
+                    ON CONFLICT (guild_id, uid) DO UPDATE SET {', '.join(f'{column}=excluded.{column}' for column in Account.columns)}""")
+            finally:
+                c.execute("DROP TABLE temp.imported")
+
+            return count
+
+    def history(self, uid, limit=10):
+        # most recent ledger entries of a user, newest first
+        with self.database() as conn:
+            c = conn.execute("""SELECT counterparty, account, delta, kind, ts FROM ledger
+                WHERE guild_id=? AND uid=? ORDER BY id DESC LIMIT ?""", (self.guild_id, uid, int(limit)))
+            return [dict(zip(("counterparty", "account", "delta", "kind", "ts"), data)) for data in c]
+
+    def verify_ledger(self, repair=False, limit=10):
+        # sum the ledger per user and compare it with the stored balances. both
+        # sides are streamed in uid order and merged, so memory stays flat.
+        # with repair, balances that disagree are set to what the ledger says
+        mismatches = []
+        checked = count = 0
+
+        with self.bulk() if repair else self.database() as handle:
+            # two cursors on the one connection, read side by side
+            conn = handle.connection if repair else handle
+            ledger = conn.execute("""SELECT uid, SUM(CASE account WHEN 'cash' THEN delta ELSE 0 END), SUM(CASE account WHEN 'bank' THEN delta ELSE 0 END)
+                FROM ledger WHERE guild_id=? GROUP BY uid ORDER BY uid""", (self.guild_id,))
+            stored = conn.execute("SELECT uid, cash, balance FROM accounts WHERE guild_id=? ORDER BY uid", (self.guild_id,))
+
+            end = (math.inf, 0, 0)
+            entry = next(ledger, end)
+            account = next(stored, end)
+
+            while entry is not end or account is not end:
+                uid = min(entry[0], account[0])
+                expected = entry[1:] if entry[0] == uid else (0, 0)
+                actual = account[1:] if account[0] == uid else (0, 0)
+
+                checked = checked + 1
+                if expected != actual:
+                    count = count + 1
+                    if repair or count <= limit:
+                        mismatches.append((uid, actual, expected))
+
+                if entry[0] == uid:
+                    entry = next(ledger, end)
+                if account[0] == uid:
+                    account = next(stored, end)
+
+            if repair:
+                handle.executemany("UPDATE accounts SET cash=?, balance=? WHERE guild_id=? AND uid=?",
+                    [(cash, balance, self.guild_id, uid) for uid, actual, (cash, balance) in mismatches])
+
+        return {"checked": checked, "mismatches": count, "sample": mismatches[:limit], "repaired": repair}
+
+    def leaderboard(self, board, page=1, uid=None, per_page=10):
+        if board not in boards:
+            raise GameExceptions.InvalidLeaderboard(f"There is no leaderboard for **{board}**, try one of {', '.join(boards)}.")
+
+        with self.transaction() as accounts:
+            ranking = self.rankings.get(board)
+            if ranking is None:
+                ranking = self.rankings[board] = Ranking(accounts.scores(boards[board][0]))
+
+            pages = max(1, math.ceil(len(ranking) / per_page))
+            page = min(max(1, int(page)), pages)
+            start = (page - 1) * per_page
+
+            entries = [(rank, uid, score) for rank, (uid, score) in enumerate(ranking.page(start, per_page), start=start + 1)]
+            rank = ranking.rank(uid) if uid is not None else None
+
+        return {"entries": entries, "page": page, "pages": pages, "total": len(ranking), "rank": rank}
+
+def import_guild_databases(source, storage):
+    # copy every ./saves/<guild_id>.db into the databases of storage,
+    # returns (files, rows). rows already present for a guild are replaced.
+    files = rows = 0
+
+    for name in sorted(os.listdir(source)):
+        guild_id = name[:-3]
+        if not name.endswith('.db') or not guild_id.isdigit():
+            continue
+
+        path = os.path.join(source, name)
+        guild_id = int(guild_id)
+
+        # bring the old file up to the current schema first
+        conn = sqlite3.connect(path)
+        migrate(conn, guild_id)
+        conn.close()
+
+        with storage.connect(guild_id) as conn:
+            conn.execute("ATTACH DATABASE ? AS source", (path,))
+            try:
+                with conn:
+                    c = conn.execute("INSERT OR REPLACE INTO main.accounts SELECT * FROM source.accounts")
+                    rows = rows + c.rowcount
+
+                    # the ledger is appended to, so a second import replaces this guild's entries
+                    conn.execute("DELETE FROM main.ledger WHERE guild_id=?", (guild_id,))
+                    conn.execute("""INSERT INTO main.ledger (guild_id, uid, counterparty, account, delta, kind, ts)
+                        SELECT guild_id, uid, counterparty, account, delta, kind, ts FROM source.ledger ORDER BY id""")
+            finally:
+                conn.execute("DETACH DATABASE source")
+
+        files = files + 1
+
+    return files, rows
+
+class GameExecutor:
+    # a few single-threaded workers for database work. a guild always maps to
+    # the same worker, so its commands run in order and never on the event loop.
+    def __init__(self, workers=4):
+        self.workers = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'economy-{index}') for index in range(workers)]
+
+    def worker(self, key):
+        return self.workers[hash(key) % len(self.workers)]
+
+    async def run(self, key, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.worker(key), partial(func, *args, **kwargs))
+
+executor = GameExecutor()
+
+class AsyncGame:
+    # await-able facade over Game for use inside coroutines
+    def __init__(self, game):
+        self.game = game
 
-        user.add_cash(self.conn, self.c, amount)
-        user.bank.withdraw(self.conn, self.c, amount)
+    @property
+    def curve(self):
+        return self.game.curve
 
-        return amount
+    @curve.setter
+    def curve(self, curve):
+        self.game.curve = curve
 
-    def transfer(self, author_id, target_id, amount):
-        user = User.get(self.conn, self.c, author_id)
-        user.bank = Bank.get(self.conn, self.c, author_id)
+    async def run(self, func, *args, **kwargs):
+        return await executor.run(self.game.guild_id, func, *args, **kwargs)
 
-        target = User.get(self.conn, self.c, target_id)
-        target.bank = Bank.get(self.conn, self.c, target_id)
+    async def register(self, uid):
+        return await self.run(self.game.register, uid)
 
-        amount = int(amount)
+    async def user(self, uid):
+        return await self.run(self.game.user, uid)
 
-        if not user or not target:
-            raise GameExceptions.UserNotFound("You must be registered to do this.")
-        if amount > user.bank.balance:
-            raise GameExceptions.InsufficientBankBalance("You do not have enough cash in the bank.")
+    async def perks(self, uid):
+        return await self.run(self.game.perks, uid)
 
-        user.bank.withdraw(self.conn, self.c, amount)
-        target.bank.deposit(self.conn, self.c, amount)
+    async def bank(self, uid):
+        return await self.run(self.game.bank, uid)
 
-        return amount
+    async def work(self, uid, multiplier=1):
+        return await self.run(self.game.work, uid, multiplier)
+
+    async def rob(self, author_id, target_id, multiplier=0.9):
+        return await self.run(self.game.rob, author_id, target_id, multiplier)
+
+    async def donate(self, author_id, target_id, amount, multiplier=1):
+        return await self.run(self.game.donate, author_id, target_id, amount, multiplier)
+
+    async def charity(self, uid, amount, multiplier=0.9):
+        return await self.run(self.game.charity, uid, amount, multiplier)
+
+    async def gamble(self, uid, amount, multiplier=1):
+        return await self.run(self.game.gamble, uid, amount, multiplier)
+
+    async def buy_work(self, uid, amount):
+        return await self.run(self.game.buy_work, uid, amount)
+
+    async def buy_rob(self, uid, amount):
+        return await self.run(self.game.buy_rob, uid, amount)
+
+    async def deposit(self, uid, amount):
+        return await self.run(self.game.deposit, uid, amount)
+
+    async def withdraw(self, uid, amount):
+        return await self.run(self.game.withdraw, uid, amount)
+
+    async def transfer(self, author_id, target_id, amount):
+        return await self.run(self.game.transfer, author_id, target_id, amount)
+
+    async def leaderboard(self, board, page=1, uid=None):
+        return await self.run(self.game.leaderboard, board, page, uid)
+
+    async def bulk_add_cash(self, uids, amount):
+        return await self.run(self.game.bulk_add_cash, uids, amount)
+
+    async def bulk_reset(self, uids=None):
+        return await self.run(self.game.bulk_reset, uids)
+
+    async def import_accounts(self, file, format='csv'):
+        return await self.run(self.game.import_accounts, file, format)
+
+    async def history(self, uid, limit=10):
+        return await self.run(self.game.history, uid, limit)
+
+    async def verify_ledger(self, repair=False):
+        return await self.run(self.game.verify_ledger, repair)
+
+class Accounts:
+    # data access for the accounts of one guild, used inside Game.transaction().
+    # a command reads the accounts it needs once and writes them back once.
+    def __init__(self, c, guild_id):
+        self.c = c
+        self.guild_id = guild_id
+        # uid -> Account written by this transaction
+        self.saved = {}
+        # ledger entries, inserted together right before commit
+        self.entries = []
+
+        # same transaction, rows come back as Account objects
+        self.reader = c.connection.cursor()
+        self.reader.row_factory = Account.row_factory
+
+    def account(self, uid):
+        self.reader.execute(f"SELECT uid, {', '.join(Account.columns)} FROM accounts WHERE guild_id=:guild AND uid=:uid", {"guild": self.guild_id, "uid": uid})
+        return self.reader.fetchone()
+
+    def accounts(self, *uids):
+        # the same uid twice gives the same object
+        self.reader.execute(f"SELECT uid, {', '.join(Account.columns)} FROM accounts WHERE guild_id=? AND uid IN ({', '.join('?' * len(uids))})", (self.guild_id, *uids))
+        found = {account.uid: account for account in self.reader.fetchall()}
+        return [found.get(uid) for uid in uids]
+
+    def register(self, uid):
+        # None when already registered
+        self.reader.execute(f"INSERT OR IGNORE INTO accounts (guild_id, uid) VALUES (:guild, :uid) RETURNING uid, {', '.join(Account.columns)}", {"guild": self.guild_id, "uid": uid})
+        account = self.reader.fetchone()
+        if account:
+            self.saved[uid] = account
+            return account
+
+    def save(self, *accounts):
+        accounts = {account.uid: account for account in accounts}
+        self.c.executemany(f"UPDATE accounts SET {', '.join(f'{column}=:{column}' for column in Account.columns)} WHERE guild_id=:guild AND uid=:uid",
+            [dict(account.data, guild=self.guild_id) for account in accounts.values()])
+        self.saved.update(accounts)
+
+    def record(self, uid, delta, kind, counterparty=None, account='cash'):
+        # ledger entry for a change to the cash or bank balance of uid
+        if delta:
+            self.entries.append((uid, counterparty, account, int(delta), kind, int(time.time() * 1000)))
+
+    def write_ledger(self):
+        if self.entries:
+            self.c.executemany(ledger_insert, [(self.guild_id, *entry) for entry in self.entries])
+            self.entries = []
+
+    def scores(self, score):
+        # (uid, score) for every account, score is an sql expression from boards
+        self.c.execute(f"SELECT uid, {score} FROM accounts WHERE guild_id=:guild", {"guild": self.guild_id})
+        return self.c.fetchall()
+
+class CachedAccounts:
+    # the Accounts methods over an AccountCache. the first change to a row
+    # keeps its old values so a failed command can be rolled back.
+    def __init__(self, cache):
+        self.cache = cache
+        self.undo = {}
+        self.saved = {}
+        # ledger entries, handed to the cache on success
+        self.entries = []
+
+    record = Accounts.record
+
+    def change(self, uid, row):
+        if uid not in self.undo:
+            self.undo[uid] = self.cache.get(uid)
+        self.cache.put(uid, row)
+
+    def account(self, uid):
+        row = self.cache.row(uid)
+        if row is not None:
+            return Account(uid, *row)
+
+    def accounts(self, *uids):
+        # the same uid twice gives the same object
+        found = {uid: self.account(uid) for uid in uids}
+        return [found[uid] for uid in uids]
+
+    def register(self, uid):
+        # None when already registered
+        if self.cache.row(uid) is None:
+            account = Account(uid)
+            self.save(account)
+            return account
+
+    def save(self, *accounts):
+        for account in accounts:
+            self.change(account.uid, tuple(int(getattr(account, column)) for column in Account.columns))
+            self.saved[account.uid] = account
+
+    def scores(self, score):
+        # leaderboards are built from the database, write pending rows first
+        self.cache.flush()
+        with self.cache.storage.connect(self.cache.guild_id) as conn:
+            return Accounts(conn.cursor(), self.cache.guild_id).scores(score)
 
 class User:
+    # value objects are kept by the hundred thousand in caches, so no __dict__
+    __slots__ = ('uid', 'level', 'exp', 'cash')
+
     def __init__(self, uid, level=1, exp=0, cash=0):
         # user.property
         self.uid = uid
@@ -346,90 +1405,58 @@ class User:
 
     @property
     def exp_to_levelup(self):
-        value = (self.level ** 2) + (self.level * 2) + 2
-        return value
+        # on the default curve, guilds with their own use Game.curve
+        return levels.default.threshold(self.level)
 
     @classmethod
     def instance(cls, data):
         return cls(*data)
 
     @classmethod
-    def get(cls, conn, c, uid):
-        with conn:
-            c.execute("SELECT * FROM users WHERE uid=:uid", {"uid": uid})
-            data = c.fetchone()
-            if data:
-                return cls.instance(data)
+    def row_factory(cls, cursor, data):
+        # sqlite3 row_factory for rows selected in __init__ order
+        return cls(*data)
 
-    def register(self, conn, c):
-        with conn:
-            # proceed only when unique uid            
-            if not self.get(conn, c, self.uid):
-                c.execute("INSERT INTO users VALUES (:uid, :level, :exp, :cash)", {
-                    "uid": int(self.uid),
-                    "level": int(self.level),
-                    "exp": int(self.exp),
-                    "cash": int(self.cash)
-                })
-                return self.get(conn, c, self.uid)
-
-    def update(self, conn, c):
-        with conn:
-            # proceed only when existent user
-            if self.get(conn, c, self.uid):
-                c.execute("UPDATE users SET level=:level, exp=:exp, cash=:cash WHERE uid=:uid", {
-                    "level": int(self.level),
-                    "exp": int(self.exp),
-                    "cash": int(self.cash),
-                    "uid": int(self.uid)
-                })
-
-    def take_cash(self, conn, c, amount: int):
-        self.cash = self.cash - amount
-        self.update(conn, c)
-        return self.cash
-
-    def add_cash(self, conn, c, amount: int):
-        self.cash = self.cash + amount
-        self.update(conn, c)
-        return self.cash
-
-    def set_cash(self, conn, c, amount: int):
-        self.cash = amount
-        self.update(conn, c)
-        return self.cash
-
-    def add_exp(self, conn, c, multiplier, override_value=None):
-        base = math.log(override_value, 1.1) if override_value else self.level
+    def gain_exp(self, multiplier, override_value=None, curve=levels.default):
+        # rolls exp and applies level ups to this object only
+        base = math.log(override_value, exp_base) if override_value else self.level
         upper_limit = round(1 + base * 2 * multiplier)
         lower_limit = 0 if override_value else self.level
         amount = random.randint(lower_limit, upper_limit)
-        self.exp = self.exp + amount
 
-        if self.exp > self.exp_to_levelup:
-            levelup = True
+        level = self.level
+        self.level, self.exp = curve.add(self.level, self.exp + amount)
 
-            while self.exp > self.exp_to_levelup:
-                max_exp = self.exp_to_levelup
-                self.exp = self.exp - max_exp
-                self.level = self.level + 1
-        else:
-            levelup = False
+        return amount, self.level > level
 
-        self.update(conn, c)
-        return amount, levelup
+class Account(User):
+    # a user with their perk charges and bank balance, stored as one row
+    __slots__ = ('work', 'rob', 'balance')
 
-    def set_exp(self, conn, c, amount: int):
-        self.exp = amount
-        self.update(conn, c)
-        return self.exp
+    columns = ('level', 'exp', 'cash', 'work', 'rob', 'balance')
+    perk_names = ('work', 'rob')
 
-    def set_level(self, conn, c, amount: int):
-        self.level = amount
-        self.update(conn, c)
-        return self.level
+    def __init__(self, uid, level=1, exp=0, cash=0, work=0, rob=0, balance=0):
+        super().__init__(uid, level, exp, cash)
+        self.work = work
+        self.rob = rob
+        self.balance = balance
+
+    @property
+    def data(self):
+        return {name: getattr(self, name) for name in ('uid', *self.columns)}
+
+    @property
+    def perks(self):
+        return Perk(self.uid, self.work, self.rob)
+
+    @property
+    def bank(self):
+        return Bank(self.uid, self.balance)
 
 class Perk:
+    __slots__ = ('uid', 'work', 'rob')
+
     def __init__(self, uid, work=0, rob=0):
         self.uid = uid
         self.work = work
@@ -437,111 +1464,23 @@ class Perk:
 
     @property
     def data(self):
-        return self.__dict__
+        return {name: getattr(self, name) for name in self.__slots__}
 
     @classmethod
     def instance(cls, data):
         return cls(*data)
 
-    def new(self, conn, c):
-        with conn:
-            c.execute("SELECT * FROM perks WHERE uid=:uid", {"uid": self.uid})
-            data = c.fetchone()
-            if not data:
-                c.execute("INSERT INTO perks VALUES (:uid, :work, :rob)", {
-                    "uid": self.uid,
-                    "work": self.work,
-                    "rob": self.rob
-                })
-
-    @classmethod
-    def get(cls, conn, c, uid):
-        data = None
-        while not data:
-            with conn:
-                c.execute("SELECT * FROM perks WHERE uid=:uid", {"uid": uid})
-                data = c.fetchone()
-                if data:
-                    return cls.instance(data)
-                else:
-                    perk = Perk(uid)
-                    perk.new(conn, c)
-
-    def update(self, conn, c):
-        if self.get(conn, c, self.uid):
-            with conn:
-                c.execute("UPDATE perks SET work=:work, rob=:rob WHERE uid=:uid", {
-                    "uid": self.uid,
-                    "work": self.work,
-                    "rob": self.rob
-                })
-        return self.get(conn, c, self.uid)
-
-    def add_rob_charge(self, conn, c, amount):
-        self.rob = self.rob + amount
-        return self.update(conn, c)
-
-    def take_rob_charge(self, conn, c, amount):
-        self.rob = self.rob - amount
-        return self.update(conn, c)
-
-    def add_work_charge(self, conn, c, amount):
-        self.work = self.work + amount
-        return self.update(conn, c)
-
-    def take_work_charge(self, conn, c, amount):
-        self.work = self.work - amount
-        return self.update(conn, c)
-
 class Bank:
+    __slots__ = ('uid', 'balance')
+
     def __init__(self, uid, balance=0):
         self.uid = uid
         self.balance = balance
 
     @property
     def data(self):
-        return self.__dict__
+        return {name: getattr(self, name) for name in self.__slots__}
 
     @classmethod
     def instance(cls, data):
         return cls(*data)
-
-    def new(self, conn, c):
-        with conn:
-            c.execute("SELECT * FROM banks WHERE uid=:uid", {"uid": self.uid})
-            data = c.fetchone()
-            if not data:
-                c.execute("INSERT INTO banks VALUES (:uid, :balance)", {
-                    "uid": self.uid,
-                    "balance": self.balance
-                })
-
-    @classmethod
-    def get(cls, conn, c, uid):
-        data = None
-        while not data:
-            with conn:
-                c.execute("SELECT * FROM banks WHERE uid=:uid", {"uid": uid})
-                data = c.fetchone()
-                if data:
-                    return cls.instance(data)
-                else:
-                    bank = Bank(uid)
-                    bank.new(conn, c)
-
-    def update(self, conn, c):
-        if self.get(conn, c, self.uid):
-            with conn:
-                c.execute("UPDATE banks SET balance=:balance WHERE uid=:uid", {
-                    "uid": self.uid,
-                    "balance": self.balance
-                })
-        return self.get(conn, c, self.uid)
-
-    def withdraw(self, conn, c, amount):
-        self.balance = self.balance - amount
-        return self.update(conn, c)
-
-    def deposit(self, conn, c, amount):
-        self.balance = self.balance + amount
-        return self.update(conn, c)
\ No newline at end of file
@@ -0,0 +1,88 @@
+from bisect import bisect_left
+
+# level curves for the economy. going from level n to n + 1 takes
+# a * n ** 2 + b * n + c exp, so the total exp needed to reach a level is a
+# cubic with an exact integer closed form. applying an exp grant is a search on
+# those totals instead of a loop over every level crossed.
+
+class Curve:
+    # totals for the first levels are kept in a table for bisect, higher
+    # levels are searched on the closed form
+    size = 1024
+
+    def __init__(self, a=1, b=2, c=2):
+        a, b, c = int(a), int(b), int(c)
+        # every level has to cost at least 1 exp or the totals stop increasing
+        if a < 0 or b < 0 or c < 1:
+            raise ValueError(f"Invalid level curve {a}, {b}, {c}: a and b cannot be negative and c has to be at least 1.")
+
+        self.a = a
+        self.b = b
+        self.c = c
+        # level -> total exp needed to reach it from level 1
+        self.totals = [self.total(level) for level in range(self.size + 1)]
+
+    def __str__(self):
+        return f"{self.a},{self.b},{self.c}"
+
+    def __repr__(self):
+        return f"Curve({self.a}, {self.b}, {self.c})"
+
+    @classmethod
+    def parse(cls, value):
+        # "a,b,c" as written in the config, the same curve is built once
+        try:
+            key = tuple(int(part) for part in str(value).replace(' ', '').split(','))
+        except ValueError:
+            raise ValueError(f"Not a level curve: {value}")
+        if len(key) != 3:
+            raise ValueError(f"Not a level curve: {value}")
+
+        if key not in curves:
+            curves[key] = cls(*key)
+        return curves[key]
+
+    def threshold(self, level):
+        # exp needed to go from level to level + 1
+        return self.a * level * level + self.b * level + self.c
+
+    def total(self, level):
+        # sum of threshold(n) for n in 1 .. level - 1
+        n = level - 1
+        return self.a * n * level * (2 * n + 1) // 6 + self.b * n * level // 2 + self.c * n
+
+    def add(self, level, exp):
+        # level and exp after levelling up while exp is more than the threshold,
+        # the way the loop in User.gain_exp used to
+        if exp <= self.threshold(level):
+            return level, exp
+
+        # the next level is the first one whose total is at least this
+        target = self.total(level) + exp
+
+        if target <= self.totals[-1]:
+            reached = bisect_left(self.totals, target, level + 1)
+        else:
+            # gallop up from the current level, most grants only cross a few
+            low = high = max(level + 1, self.size + 1)
+            step = 1
+            while self.total(high) < target:
+                low = high + 1
+                high = high + step
+                step = step * 2
+
+            while low < high:
+                middle = (low + high) // 2
+                if self.total(middle) < target:
+                    low = middle + 1
+                else:
+                    high = middle
+            reached = low
+
+        level = reached - 1
+        return level, target - self.total(level)
+
+# (a, b, c) -> Curve, shared by every guild using it
+curves = {}
+
+default = Curve.parse("1,2,2")
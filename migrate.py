@@ -0,0 +1,41 @@
+import argparse
+
+from logger import console_log
+from config import SettingsDatabase
+from game import Storage, import_guild_databases
+
+# usage:
+# python migrate.py config [--source ./config] [--db ./config/settings.db]
+# python migrate.py economy [--source ./saves] [--shards 1]
+
+def migrate_config(args):
+    database = SettingsDatabase(args.db)
+    files, rows = database.import_ini(args.source)
+    console_log(f"Imported {rows} settings from {files} config files into {args.db}.")
+
+def migrate_economy(args):
+    storage = Storage(args.source, 'sharded', args.shards)
+    files, rows = import_guild_databases(args.source, storage)
+    storage.close()
+    console_log(f"Imported {rows} rows from {files} guild databases into {args.shards} economy shards in {args.source}.")
+    console_log(f"Start the bot with ECONOMY_STORAGE=sharded ECONOMY_SHARDS={args.shards} to use them.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Data migrations for Mona.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    config = subparsers.add_parser('config', help="Import per guild .ini files into the sqlite settings store.")
+    config.add_argument('--source', default='./config')
+    config.add_argument('--db', default='./config/settings.db')
+    config.set_defaults(func=migrate_config)
+
+    economy = subparsers.add_parser('economy', help="Import per guild economy .db files into sharded economy databases.")
+    economy.add_argument('--source', default='./saves')
+    economy.add_argument('--shards', type=int, default=1)
+    economy.set_defaults(func=migrate_economy)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+import argparse
+import sqlite3
+import time
+
+import game
+
+from levels import Curve, default
+from logger import console_log
+
+# numpy is only needed here, the bot runs without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# usage:
+# python simulate.py [--users 100000] [--rounds 100] [--report 10] [--seed 0]
+#                    [--mix work=5,rob=2,gamble=2,donate=0.5,charity=0.5] [--stake 0.1]
+#                    [--curve 1,2,2] [--database ./saves/<guild_id>.db --guild <guild_id>]
+#
+# every round each simulated user runs one command, picked by the weights in --mix.
+# gamble, donate and charity put a --stake share of the user's cash in.
+# rolls, payouts and exp follow game.py, perks and cooldowns are left out.
+
+commands = ['work', 'rob', 'gamble', 'donate', 'charity']
+# the multipliers the cog calls the commands with, the Game method defaults
+multipliers = {'work': 1.0, 'rob': 0.9, 'donate': 1.0, 'charity': 0.9}
+
+class Economy:
+    # simulated users as columns: level, exp and cash arrays indexed by user
+    def __init__(self, users, curve=default, stake=0.1, seed=None, level=None, exp=None, cash=None):
+        self.rng = np.random.default_rng(seed)
+        self.curve = curve
+        self.stake = stake
+        self.users = users
+
+        self.level = np.ones(users, np.int64) if level is None else np.asarray(level, np.int64)
+        self.exp = np.zeros(users, np.int64) if exp is None else np.asarray(exp, np.int64)
+        self.cash = np.zeros(users, np.int64) if cash is None else np.asarray(cash, np.int64)
+
+        # level -> total exp to reach it, grown as users climb
+        self.totals = curve.total(np.arange(curve.size + 1, dtype=np.int64))
+        self.commands = 0
+
+    def randint(self, low, high):
+        # random.randint for every element, both ends included
+        return self.rng.integers(low, np.maximum(low, high) + 1)
+
+    def others(self, who):
+        # a random user that is not the one acting
+        target = self.rng.integers(0, self.users - 1, len(who))
+        return target + (target >= who)
+
+    def grow(self, size):
+        # make the totals table cover levels below size
+        if size > len(self.totals):
+            self.totals = self.curve.total(np.arange(max(size, len(self.totals) * 2), dtype=np.int64))
+
+    def gain_exp(self, who, multiplier, value=None):
+        # User.gain_exp and Curve.add for many users at once
+        level = self.level[who]
+        if value is None:
+            base = level
+            lower = level
+        else:
+            spent = value > 0
+            base = np.where(spent, np.log(np.maximum(value, 1)) / np.log(game.exp_base), level)
+            lower = np.where(spent, 0, level)
+
+        upper = np.rint(1 + base * 2 * multiplier).astype(np.int64)
+        self.grow(level.max(initial=0) + 1)
+        target = self.totals[level] + self.exp[who] + self.randint(lower, upper)
+
+        highest = target.max(initial=0)
+        while self.totals[-1] < highest:
+            self.grow(len(self.totals) * 2)
+
+        reached = np.maximum(np.searchsorted(self.totals, target), level + 1) - 1
+        self.level[who] = reached
+        self.exp[who] = target - self.totals[reached]
+
+    def work(self, who):
+        multiplier = multipliers['work']
+        level = self.level[who]
+        amount = np.rint(self.randint(level * game.work_pay[0], level * game.work_pay[1]) * multiplier).astype(np.int64)
+        self.gain_exp(who, multiplier)
+        self.cash[who] += amount
+
+    def rob(self, who):
+        multiplier = multipliers['rob']
+        target = self.others(who)
+        upper = np.rint(self.cash[target] * game.rob_share).astype(np.int64)
+
+        # the same checks that make Game.rob refuse
+        valid = (self.cash[target] > 0) & (upper >= 1)
+        who, target, upper = who[valid], target[valid], upper[valid]
+
+        amount = np.rint(self.randint(0, upper) * multiplier).astype(np.int64)
+        failed = self.randint(0, 100) > game.rob_odds
+
+        self.cash[who[failed]] -= amount[failed]
+
+        success = ~failed
+        self.gain_exp(who[success], multiplier)
+        self.cash[who[success]] += amount[success]
+        # several users can rob the same target in one round
+        np.subtract.at(self.cash, target[success], amount[success])
+
+    def gamble(self, who):
+        amount = (np.maximum(self.cash[who], 0) * self.stake).astype(np.int64)
+        value = self.randint(np.rint(amount * game.gamble_pay[0]).astype(np.int64), np.rint(amount * game.gamble_pay[1]).astype(np.int64))
+        win = self.randint(0, 100) > game.gamble_odds
+        self.cash[who] += np.where(win, value, -value)
+
+    def donate(self, who):
+        multiplier = multipliers['donate']
+        amount = (np.maximum(self.cash[who], 0) * self.stake).astype(np.int64)
+
+        valid = amount > 0
+        who, amount = who[valid], amount[valid]
+        target = self.others(who)
+
+        self.gain_exp(who, multiplier, amount)
+        self.cash[who] -= amount
+        np.add.at(self.cash, target, amount)
+
+    def charity(self, who):
+        multiplier = multipliers['charity']
+        amount = (np.maximum(self.cash[who], 0) * self.stake).astype(np.int64)
+        self.gain_exp(who, multiplier, amount)
+        self.cash[who] -= amount
+
+    def play(self, mix):
+        # one round, every user runs one command
+        picked = self.rng.choice(len(commands), self.users, p=mix)
+        for index, name in enumerate(commands):
+            who = np.flatnonzero(picked == index)
+            if len(who):
+                getattr(self, name)(who)
+        self.commands = self.commands + self.users
+
+    def summary(self):
+        cash = np.sort(self.cash)
+        supply = int(cash.sum())
+
+        # gini and top 1% share over what users hold, debts count as nothing
+        held = np.maximum(cash, 0)
+        total = held.sum()
+        if total:
+            ranks = np.arange(1, self.users + 1)
+            gini = (2 * (ranks * held).sum()) / (self.users * total) - (self.users + 1) / self.users
+            top = held[-max(1, self.users // 100):].sum() / total
+        else:
+            gini = top = 0.0
+
+        p10, p50, p90 = np.percentile(self.level, [10, 50, 90])
+        return {
+            "supply": supply,
+            "median": int(cash[self.users // 2]),
+            "gini": gini,
+            "top": top,
+            "debt": (cash < 0).mean(),
+            "levels": (int(p10), int(p50), int(p90), int(self.level.max()))
+        }
+
+def parse_mix(value):
+    weights = dict.fromkeys(commands, 0.0)
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in weights:
+            raise argparse.ArgumentTypeError(f"Unknown command '{name}', expected one of {', '.join(commands)}.")
+        weights[name] = float(weight)
+
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("The mix needs at least one command with a weight above zero.")
+    return [weights[name] / total for name in commands]
+
+def load_guild(path, guild_id):
+    # starting balances of a live guild, read only
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT level, exp, cash FROM accounts WHERE guild_id=? ORDER BY uid", (guild_id,)).fetchall()
+    finally:
+        conn.close()
+
+    if len(rows) < 2:
+        raise SystemExit(f"Guild {guild_id} in {path} needs at least two accounts to simulate.")
+    return np.array(rows, np.int64).T
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the economy offline to check balance changes.")
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=100)
+    parser.add_argument('--report', type=int, default=10, help="Rounds between report lines.")
+    parser.add_argument('--mix', type=parse_mix, default="work=5,rob=2,gamble=2,donate=0.5,charity=0.5")
+    parser.add_argument('--stake', type=float, default=0.1, help="Share of cash put into gamble, donate and charity.")
+    parser.add_argument('--curve', type=Curve.parse, default=default, help="Level curve as a,b,c.")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--database', help="Start from the accounts of a guild in this economy database.")
+    parser.add_argument('--guild', type=int, help="Guild to read from --database.")
+    args = parser.parse_args()
+
+    if np is None:
+        raise SystemExit("simulate.py needs numpy: pip install numpy")
+
+    if args.database:
+        if args.guild is None:
+            parser.error("--database needs --guild")
+        level, exp, cash = load_guild(args.database, args.guild)
+        economy = Economy(len(cash), args.curve, args.stake, args.seed, level, exp, cash)
+    else:
+        if args.users < 2:
+            parser.error("--users has to be at least 2")
+        economy = Economy(args.users, args.curve, args.stake, args.seed)
+
+    console_log(f"Simulating {economy.users} users for {args.rounds} rounds on level curve {args.curve}.")
+    print(f"{'round':>6} {'supply':>16} {'growth/round':>13} {'median cash':>12} {'gini':>6} {'top 1%':>7} {'in debt':>8} {'level p10/p50/p90/max':>24}")
+
+    last = economy.summary()
+    elapsed = 0.0
+    for done in range(1, args.rounds + 1):
+        start = time.perf_counter()
+        economy.play(args.mix)
+        elapsed = elapsed + time.perf_counter() - start
+
+        if done % args.report and done != args.rounds:
+            continue
+
+        data = economy.summary()
+        # inflation as the average growth of the money supply per round since the last line
+        rounds = done % args.report or args.report
+        if last["supply"] > 0 and data["supply"] > 0:
+            growth = f"{((data['supply'] / last['supply']) ** (1 / rounds) - 1) * 100:+.2f}%"
+        else:
+            growth = "-"
+        levels = "/".join(str(level) for level in data["levels"])
+
+        print(f"{done:>6} {data['supply']:>16,} {growth:>13} {data['median']:>12,} {data['gini']:>6.3f} {data['top'] * 100:>6.1f}% {data['debt'] * 100:>7.1f}% {levels:>24}")
+        last = data
+
+    console_log(f"Simulated {economy.commands:,} commands in {elapsed:.2f}s, {economy.commands / elapsed:,.0f} commands/s.")
+
+if __name__ == '__main__':
+    main()